@@ -237,3 +237,35 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # API VERSION
 # ---------------------------------------------------------
 API_VERSION = "v1"
+
+
+# ---------------------------------------------------------
+# CACHE
+# ---------------------------------------------------------
+# Cache partagé par tous les workers de la machine : il porte notamment la version de
+# l'arborescence (cf. request_ddi.core.hierarchy), qui doit être vue de chaque processus
+# dès qu'un autre l'invalide. Avec plusieurs machines, utiliser un serveur de cache commun
+# (Redis, Memcached) : sinon l'arborescence peut rester périmée jusqu'à
+# HIERARCHY_CACHE_TIMEOUT secondes sur les autres machines.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.getenv("CACHE_DIR") or os.path.join(BASE_DIR, "cache"),
+    }
+}
+
+
+# ---------------------------------------------------------
+# HIERARCHY CACHE
+# ---------------------------------------------------------
+# Durée de vie maximale (secondes) de l'arborescence collections / enquêtes en mémoire
+HIERARCHY_CACHE_TIMEOUT = int(os.getenv("HIERARCHY_CACHE_TIMEOUT") or 300)
+
+
+# ---------------------------------------------------------
+# EXPORT SNAPSHOTS
+# ---------------------------------------------------------
+# Répertoire des exports CSV pré-générés par la commande generate_export_snapshots
+EXPORT_SNAPSHOTS_DIR = os.getenv("EXPORT_SNAPSHOTS_DIR") or os.path.join(
+    BASE_DIR, "export_snapshots"
+)
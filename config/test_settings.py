@@ -3,6 +3,8 @@ from .settings import *  # noqa: F403
 SECRET_KEY = "test"  # noqa: S105
 
 DATABASES["default"] = {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"}  # noqa: F405
+# Un seul processus : pas besoin du cache partagé sur disque
+CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
 
 LOGGING["loggers"]["performance"] = {  # noqa: F405
     "handlers": [],
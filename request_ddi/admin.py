@@ -11,6 +11,7 @@ from .core.models import (
     Concept,
     ConceptualVariable,
     Distributor,
+    ImportedFile,
     RepresentedVariable,
     Subcollection,
     Survey,
@@ -26,4 +27,5 @@ admin.site.register(BindingConcept)
 admin.site.register(Collection)
 admin.site.register(Subcollection)
 admin.site.register(Distributor)
+admin.site.register(ImportedFile)
 admin.site.register(BindingVariableCategoryStat)
@@ -1,13 +1,14 @@
 from django.conf import settings
 from django.urls import path
 
+from .views.export_views import ExportSearchResultsCSVView
 from .views.filter_views import (
     get_decades,
     get_subcollections_by_collections,
     get_surveys_by_subcollections,
     get_years_by_decade,
 )
-from .views.search_views import SearchResultsDataView
+from .views.search_views import SearchFacetsView, SearchResultsDataView, get_suggestions
 
 app_name = "request_ddi_api"
 
@@ -21,6 +22,13 @@ urlpatterns = [
         SearchResultsDataView.as_view(),
         name="search_results_data",
     ),
+    path(
+        f"{API_VERSION}/export-search-results/",
+        ExportSearchResultsCSVView.as_view(),
+        name="export_search_results",
+    ),
+    path(f"{API_VERSION}/facets/", SearchFacetsView.as_view(), name="facets"),
+    path(f"{API_VERSION}/suggest/", get_suggestions, name="suggest"),
     path(
         f"{API_VERSION}/get-subcollections-by-collections/",
         get_subcollections_by_collections,
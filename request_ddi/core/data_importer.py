@@ -1,8 +1,11 @@
 # -- STDLIB
+import hashlib
+import json
 import logging
 import time
 
 from request_ddi.utils.normalize_string import (
+    normalize_many,
     normalize_string_for_comparison,
     normalize_string_for_database,
 )
@@ -17,15 +20,32 @@ from .models import (
     RepresentedVariable,
     Survey,
 )
+from .signals import import_in_progress
 
 logger = logging.getLogger("performance")
 batch_size = 50
 
 
+def content_hash(question_data):
+    """
+    Empreinte d'une variable lue dans le XML : libellé, question, catégories (statistiques
+    comprises), univers et notes. Le DOI et le nom de variable servent de clé et en sont exclus.
+    """
+    payload = json.dumps(list(question_data[2:]), ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
 class DataImporter:
-    def __init__(self):
+    def __init__(self, incremental=False):
         self.errors = []
-
+        # En mode incrémental, les variables dont l'empreinte n'a pas changé sont ignorées
+        self.incremental = incremental
+        self.num_unchanged = 0
+        # Formes normalisées préparées en lot : texte → base de données, puis → comparaison
+        self.for_database = {}
+        self.for_comparison = {}
+
+    @import_in_progress()
     def import_data(self, question_datas):  # noqa: PLR0912, C901, PLR0915
         batch_size = 50
         num_records = 0
@@ -46,13 +66,41 @@ class DataImporter:
 
         for doi, questions in data_by_doi.items():
             start_time = time.time()
+            # Variables dont la liste de bindings change (cf. sibling_binding_ids)
+            affected_variable_ids = set()
             try:
                 if doi in missing_dois:
                     msg = f"Survey with DOI {doi} not found"
                     raise Survey.DoesNotExist(msg)
 
                 survey = surveys_dict[doi]
-                for question_data in questions:
+                existing_hashes = (
+                    dict(
+                        BindingSurveyRepresentedVariable.objects.filter(survey=survey).values_list(
+                            "variable_name", "content_hash"
+                        )
+                    )
+                    if self.incremental
+                    else {}
+                )
+                hashed_questions = [
+                    (question_data, content_hash(question_data)) for question_data in questions
+                ]
+                changed_questions = [
+                    (question_data, row_hash)
+                    for question_data, row_hash in hashed_questions
+                    if existing_hashes.get(question_data[1]) != row_hash
+                ]
+                num_unchanged = len(questions) - len(changed_questions)
+                self.num_unchanged += num_unchanged
+                num_records += num_unchanged
+
+                # Questions et libellés de catégories de l'enquête normalisés en un seul lot
+                self.prepare_normalization(
+                    [question_data for question_data, _ in changed_questions]
+                )
+                hashed_bindings = []
+                for question_data, row_hash in changed_questions:
                     (
                         variable_name,
                         variable_label,
@@ -65,7 +113,9 @@ class DataImporter:
                     binding = BindingSurveyRepresentedVariable.objects.filter(
                         survey=survey, variable_name=variable_name
                     ).first()
-                    if not binding:
+                    if binding:
+                        affected_variable_ids.add(binding.variable_id)
+                    else:
                         placeholder_rv = self.create_placeholder_rv(variable_label)
                         binding = BindingSurveyRepresentedVariable.objects.create(
                             survey=survey,
@@ -87,6 +137,7 @@ class DataImporter:
                     )
                     binding.variable = represented_variable
                     binding.save()
+                    affected_variable_ids.add(represented_variable.id)
 
                     if placeholder_rv:
                         conceptual = placeholder_rv.conceptual_var
@@ -100,6 +151,9 @@ class DataImporter:
                     binding, created_or_changed_binding = self.get_or_create_binding(
                         survey, represented_variable, variable_name, universe, notes
                     )
+                    hashed_bindings.append(
+                        BindingSurveyRepresentedVariable(pk=binding.pk, content_hash=row_hash)
+                    )
 
                     if created_or_changed_binding:
                         num_new_bindings += 1
@@ -114,6 +168,12 @@ class DataImporter:
 
                     num_records += 1
 
+                # Empreintes enregistrées sans save() : ni signal ni réindexation
+                BindingSurveyRepresentedVariable.objects.bulk_update(
+                    hashed_bindings, ["content_hash"], batch_size=500
+                )
+                RepresentedVariable.refresh_sibling_binding_ids(affected_variable_ids)
+
             except Survey.DoesNotExist:
                 self.errors.append(f"DOI '{doi}' non trouvé dans la base de données.")
             except ValueError as ve:
@@ -142,6 +202,36 @@ class DataImporter:
 
         return num_records, num_new_variables, num_new_bindings
 
+    def prepare_normalization(self, question_datas):
+        """
+        Normalise en lot (cf. normalize_many) les questions et libellés de catégories des
+        variables à importer : chaque texte distinct n'est traité qu'une fois.
+        """
+        texts = [question_data[3] for question_data in question_datas]
+        for question_data in question_datas:
+            try:
+                categories = self.parse_categories(question_data[4]) if question_data[4] else []
+            except ValueError:
+                # Catégories mal formées : l'erreur sera signalée lors de l'import de la ligne
+                continue
+            texts.extend(label for _, label, _, _ in categories)
+
+        for_database = normalize_many(texts)
+        self.for_database = dict(zip(texts, for_database))
+        self.for_comparison = dict(
+            zip(for_database, normalize_many(for_database, normalize_string_for_comparison))
+        )
+
+    def normalize_for_database(self, text):
+        if text in self.for_database:
+            return self.for_database[text]
+        return normalize_string_for_database(text)
+
+    def normalize_for_comparison(self, text):
+        if text in self.for_comparison:
+            return self.for_comparison[text]
+        return normalize_string_for_comparison(text)
+
     def get_or_create_binding(self, survey, represented_variable, variable_name, universe, notes):
         # Étape 1 : on cherche un binding existant via survey + variable_name
         binding = BindingSurveyRepresentedVariable.objects.filter(
@@ -177,7 +267,7 @@ class DataImporter:
             [
                 (
                     code,
-                    normalize_string_for_comparison(normalize_string_for_database(label)),
+                    self.normalize_for_comparison(self.normalize_for_database(label)),
                 )
                 for code, label, stat, missing in self.parse_categories(category_string)
             ]
@@ -185,7 +275,7 @@ class DataImporter:
             else []
         )
         existing_categories_list = [
-            (category.code, normalize_string_for_comparison(category.category_label))
+            (category.code, self.normalize_for_comparison(category.category_label))
             for category in existing_categories.all()
         ]
 
@@ -205,9 +295,8 @@ class DataImporter:
         if category_string:
             parsed_categories = self.parse_categories(category_string)
             for code, label, stat, missing in parsed_categories:
-                category, _ = Category.objects.get_or_create(
-                    code=code,
-                    category_label=normalize_string_for_database(label),
+                category, _ = Category.get_or_create_by_label(
+                    code, self.normalize_for_database(label)
                 )
                 if category.missing != missing:
                     category.missing = missing
@@ -250,8 +339,8 @@ class DataImporter:
         binding,
         cleaned_questions,
     ):
-        name_question_for_database = normalize_string_for_database(question_text)
-        name_question_for_comparison = normalize_string_for_comparison(name_question_for_database)
+        name_question_for_database = self.normalize_for_database(question_text)
+        name_question_for_comparison = self.normalize_for_comparison(name_question_for_database)
 
         if not name_question_for_comparison:
             # Cas particulier : pas de texte de question → on regarde si déjà lié par nom
@@ -13,6 +13,14 @@ from .models import BindingSurveyRepresentedVariable
 
 logger = logging.getLogger(__name__)
 
+# Nom du contexte utilisé par le completion suggester pour filtrer les suggestions
+SUGGEST_CONTEXT = "scope"
+
+
+def suggest_scope(scope, year):
+    """Valeur de contexte du suggester combinant un périmètre et une année de début."""
+    return f"{scope}|year:{year}"
+
 
 @registry.register_document
 class BindingSurveyDocument(Document):
@@ -22,6 +30,7 @@ class BindingSurveyDocument(Document):
             "name": fields.TextField(),
             "external_ref": fields.TextField(),
             "start_date": fields.DateField(),
+            "start_year": fields.IntegerField(),
             "subcollection": fields.ObjectField(
                 properties={
                     "id": fields.IntegerField(),
@@ -30,18 +39,30 @@ class BindingSurveyDocument(Document):
             ),
         }
     )
+    # Les offsets stockés permettent au highlighter "unified" de ne pas ré-analyser les textes
+    variable_name = fields.TextField(index_options="offsets")
     variable = fields.ObjectField(
         properties={
-            "question_text": fields.TextField(analyzer="combined_analyzer"),
-            "internal_label": fields.TextField(analyzer="combined_analyzer"),
+            "question_text": fields.TextField(
+                analyzer="combined_analyzer", index_options="offsets"
+            ),
+            "internal_label": fields.TextField(
+                analyzer="combined_analyzer", index_options="offsets"
+            ),
             "categories": fields.NestedField(
                 properties={
                     "code": fields.TextField(),
-                    "category_label": fields.TextField(analyzer="combined_analyzer"),
+                    "category_label": fields.TextField(
+                        analyzer="combined_analyzer", index_options="offsets"
+                    ),
                 }
             ),
         }
     )
+    suggest = fields.CompletionField(
+        analyzer="suggest_analyzer",
+        contexts=[{"name": SUGGEST_CONTEXT, "type": "category"}],
+    )
 
     class Index:
         name = "binding_survey_variables"
@@ -80,7 +101,15 @@ class BindingSurveyDocument(Document):
                                 "asciifolding_filter",
                                 "french_stop",
                             ],
-                        }
+                        },
+                        "suggest_analyzer": {
+                            "type": "custom",
+                            "tokenizer": "standard",
+                            "filter": [
+                                "lowercase",
+                                "asciifolding_filter",
+                            ],
+                        },
                     },
                 },
             }
@@ -89,7 +118,6 @@ class BindingSurveyDocument(Document):
     class Django:
         model = BindingSurveyRepresentedVariable
         fields = [  # noqa: RUF012
-            "variable_name",
             "notes",
             "universe",
         ]
@@ -128,9 +156,10 @@ class BindingSurveyDocument(Document):
 
     def serialize(self, instance):
         """Prépare les données du document pour Elasticsearch."""
+        # Les catégories sont indexées déjà triées pour éviter un tri à chaque recherche
         categories = [
             {"code": category.code, "category_label": category.category_label}
-            for category in instance.variable.categories.all()
+            for category in instance.variable.ordered_categories
         ]
         return {
             "variable_name": instance.variable_name,
@@ -141,6 +170,7 @@ class BindingSurveyDocument(Document):
                 "name": instance.survey.name,
                 "external_ref": instance.survey.external_ref,
                 "start_date": instance.survey.start_date,
+                "start_year": instance.survey.start_year,
                 "subcollection": {
                     "id": instance.survey.subcollection.id
                     if instance.survey.subcollection
@@ -155,8 +185,30 @@ class BindingSurveyDocument(Document):
                 "internal_label": instance.variable.internal_label,
                 "categories": categories,
             },
+            "suggest": self.prepare_suggest(instance),
         }
 
+    def prepare_suggest(self, instance):
+        """Prépare les entrées du completion suggester et leurs contextes de filtrage."""
+        inputs = [
+            text
+            for text in (instance.variable.question_text, instance.variable.internal_label)
+            if text
+        ]
+        if not inputs:
+            return None
+        scopes = ["all", f"survey:{instance.survey.id}"]
+        subcollection = instance.survey.subcollection
+        if subcollection:
+            scopes.append(f"subcollection:{subcollection.id}")
+            if subcollection.collection_id:
+                scopes.append(f"collection:{subcollection.collection_id}")
+        # Les contextes d'un suggester se combinent en OU : le filtre sur l'année est donc
+        # porté par des valeurs composées périmètre + année (ex. "collection:3|year:2020")
+        if instance.survey.start_year is not None:
+            scopes += [suggest_scope(scope, instance.survey.start_year) for scope in scopes]
+        return {"input": inputs, "contexts": {SUGGEST_CONTEXT: scopes}}
+
     def update_index(self):
         """Met à jour l'index Elasticsearch avec les documents non indexés."""
         start_time = time.time()
@@ -0,0 +1,145 @@
+# -- STDLIB
+import contextlib
+import hashlib
+import json
+import os
+import uuid
+import weakref
+from collections import namedtuple
+
+# -- DJANGO
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+MANIFEST_NAME = "manifest.json"
+# Jeton renouvelé à chaque invalidation, cf. snapshot_version()
+VERSION_NAME = "version"
+# Attribut de la connexion désignant l'invalidation en attente du commit
+PENDING_INVALIDATION_ATTR = "request_ddi_export_invalidation"
+FULL_EXPORT_KEY = "all"
+
+Snapshot = namedtuple("Snapshot", ["path", "etag", "last_modified"])
+
+
+def snapshot_key(collection_id=None):
+    """Clé du manifeste : export complet ou export d'une collection."""
+    return FULL_EXPORT_KEY if collection_id is None else f"collection:{collection_id}"
+
+
+def snapshot_filename(collection_id=None):
+    if collection_id is None:
+        return "questions_export.csv"
+    return f"questions_export_collection_{collection_id}.csv"
+
+
+def _manifest_path():
+    return os.path.join(settings.EXPORT_SNAPSHOTS_DIR, MANIFEST_NAME)
+
+
+def _version_path():
+    return os.path.join(settings.EXPORT_SNAPSHOTS_DIR, VERSION_NAME)
+
+
+def get_snapshot(collection_id=None):
+    """
+    Retourne l'export pré-généré demandé, ou None s'il n'existe pas ou a été invalidé
+    depuis sa génération (jeton de version du manifeste différent du jeton courant).
+    """
+    try:
+        with open(_manifest_path(), encoding="utf-8") as manifest_file:
+            manifest = json.load(manifest_file)
+    except (FileNotFoundError, ValueError):
+        return None
+
+    if manifest.get("version") is None or manifest["version"] != snapshot_version():
+        return None
+
+    entry = manifest["files"].get(snapshot_key(collection_id))
+    if entry is None:
+        return None
+
+    path = os.path.join(settings.EXPORT_SNAPSHOTS_DIR, entry["file"])
+    if not os.path.exists(path):
+        return None
+    return Snapshot(path, entry["etag"], manifest["generated_at"])
+
+
+def write_snapshot(collection_id, rows):
+    """Écrit un export dans un fichier temporaire puis le met en place de façon atomique."""
+    filename = snapshot_filename(collection_id)
+    path = os.path.join(settings.EXPORT_SNAPSHOTS_DIR, filename)
+    tmp_path = f"{path}.tmp"
+    digest = hashlib.sha256()
+
+    with open(tmp_path, "w", encoding="utf-8", newline="") as snapshot_file:
+        for row in rows:
+            snapshot_file.write(row)
+            digest.update(row.encode("utf-8"))
+    os.replace(tmp_path, path)
+
+    return {"file": filename, "etag": digest.hexdigest()}
+
+
+def write_manifest(files, version):
+    """
+    Publie les exports générés à partir des données de la version donnée (cf.
+    snapshot_version) : ils ne sont servis que tant que cette version reste la courante.
+    """
+    manifest = {
+        "generated_at": int(timezone.now().timestamp()),
+        "version": version,
+        "files": files,
+    }
+    tmp_path = f"{_manifest_path()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as manifest_file:
+        json.dump(manifest, manifest_file)
+    os.replace(tmp_path, _manifest_path())
+
+
+def snapshot_version():
+    """
+    Jeton de la dernière invalidation (None s'il n'y en a pas encore eu) : un export n'est
+    servi que si le jeton n'a pas changé depuis le début de sa génération.
+    """
+    try:
+        with open(_version_path(), encoding="utf-8") as version_file:
+            return version_file.read()
+    except FileNotFoundError:
+        return None
+
+
+def invalidate_export_snapshots():
+    """
+    Retire le manifeste : les exports redeviennent calculés à la demande. Le jeton de
+    version est renouvelé pour qu'un manifeste écrit par une génération en cours ne soit
+    pas servi.
+    """
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(_manifest_path())
+    # Sans répertoire, aucun export n'a été généré ni n'est en cours de génération
+    with contextlib.suppress(FileNotFoundError):
+        tmp_path = f"{_version_path()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as version_file:
+            version_file.write(uuid.uuid4().hex)
+        os.replace(tmp_path, _version_path())
+
+
+def invalidate_export_snapshots_on_commit():
+    """
+    Invalide les exports au commit de la transaction en cours, une seule fois quel que
+    soit le nombre de modifications (ex. une par ligne lors d'un import XML).
+    """
+    connection = transaction.get_connection()
+    # Référence faible : si la transaction ou le point de sauvegarde est annulé, Django
+    # abandonne le callback, la référence s'éteint et l'invalidation est réenregistrée
+    pending = getattr(connection, PENDING_INVALIDATION_ATTR, None)
+    if pending is not None and pending() is not None:
+        return
+
+    def invalidate():
+        setattr(connection, PENDING_INVALIDATION_ATTR, None)
+        invalidate_export_snapshots()
+
+    setattr(connection, PENDING_INVALIDATION_ATTR, weakref.ref(invalidate))
+    transaction.on_commit(invalidate)
@@ -1,5 +1,6 @@
 # -- STDLIB
 import csv
+import io
 
 # -- THIRDPARTY
 from bs4 import BeautifulSoup
@@ -10,11 +11,18 @@ from django.contrib.auth.forms import AuthenticationForm
 from django.forms import ModelForm
 
 # -- REQUEST_DDI (LOCAL)
-from .models import Collection, Distributor
+from .models import Collection, Distributor, ImportedFile
 
 
 class XMLUploadForm(forms.Form):
+    # Déclaré avant xml_file pour être déjà nettoyé lors de clean_xml_file
+    force = forms.BooleanField(
+        required=False, label="Réimporter les fichiers identiques à un import précédent"
+    )
     xml_file = forms.FileField(label="Select an XML file")
+    incremental = forms.BooleanField(
+        required=False, label="Ignorer les variables inchangées depuis le dernier import"
+    )
 
     # Liste des balises obligatoires et attributs
     required_tags = ["IDNo", "var", "catValu", "labl", "catgry", "qstnLit"]  # noqa: RUF012
@@ -29,6 +37,16 @@ class XMLUploadForm(forms.Form):
             msg = "Le fichier doit être au format XML."
             raise forms.ValidationError(msg)
 
+        # Empreinte réutilisée par la vue pour reconnaître les fichiers déjà importés
+        self.cleaned_data["sha256"] = ImportedFile.hash_file(xml_file)
+
+        # Fichier identique à un import précédent : la vue répond sans l'analyser
+        if (
+            not self.cleaned_data.get("force")
+            and ImportedFile.objects.filter(sha256=self.cleaned_data["sha256"]).exists()
+        ):
+            return xml_file
+
         try:
             content = xml_file.read().decode("utf-8")
 
@@ -126,6 +144,9 @@ class CollectionForm(ModelForm):
 
 class CSVUploadFormCollection(forms.Form):
     csv_file = forms.FileField(label="Sélectionnez un fichier CSV")
+    upsert = forms.BooleanField(
+        required=False, label="Mettre à jour les enquêtes existantes (clé : DOI)"
+    )
 
     required_columns = [  # noqa: RUF012
         "doi",
@@ -144,6 +165,8 @@ class CSVUploadFormCollection(forms.Form):
         "sous-collection",
     ]
     validate_duplicates = True
+    # Taille de l'extrait (en caractères) utilisé pour détecter le délimiteur
+    sniff_size = 4096
 
     def clean_csv_file(self):
         csv_file = self.cleaned_data["csv_file"]
@@ -151,21 +174,29 @@ class CSVUploadFormCollection(forms.Form):
             msg = "Le fichier doit être au format CSV."
             raise forms.ValidationError(msg)
         try:
-            decoded_file = csv_file.read().decode("utf-8").splitlines()
-            sample = "\n".join(decoded_file[:2])
-            sniffer = csv.Sniffer()
-            delimiter = sniffer.sniff(sample).delimiter
-            reader = csv.DictReader(decoded_file, delimiter=delimiter)
-            # Validation des colonnes manquantes
-            missing_columns = [col for col in self.required_columns if col not in reader.fieldnames]
+            # Seuls les premiers Ko sont décodés : le fichier n'est jamais chargé en entier
+            text = io.TextIOWrapper(csv_file.file, encoding="utf-8", newline="")
+            try:
+                sample = "\n".join(text.read(self.sniff_size).splitlines()[:2])
+                sniffer = csv.Sniffer()
+                delimiter = sniffer.sniff(sample).delimiter
+                text.seek(0)
+                reader = csv.DictReader(text, delimiter=delimiter)
+                # Validation des colonnes manquantes
+                missing_columns = [
+                    col for col in self.required_columns if col not in (reader.fieldnames or [])
+                ]
+            finally:
+                # Rend la main sur le fichier envoyé sans le fermer
+                text.detach()
             if missing_columns:
                 msg = f"Les colonnes suivantes sont manquantes : {', '.join(missing_columns)}"
                 raise forms.ValidationError(msg)
 
-            self.cleaned_data["decoded_csv"] = decoded_file
+            csv_file.seek(0)
             self.cleaned_data["delimiter"] = delimiter
-            # Si tout va bien, renvoie le fichier décodé pour un traitement ultérieur
-            return decoded_file
+            # Le fichier est relu ligne à ligne lors de l'import
+            return csv_file
 
         except Exception as e:
             msg = f"Erreur lors de la lecture du fichier CSV : {e!s}"
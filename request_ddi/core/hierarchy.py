@@ -0,0 +1,157 @@
+# -- STDLIB
+import threading
+import time
+import uuid
+from collections import namedtuple
+
+# -- DJANGO
+from django.conf import settings
+from django.core.cache import cache
+
+# -- REQUEST_DDI (LOCAL)
+from request_ddi.utils.sort import alphanum_key
+
+from .models import Collection, Subcollection, Survey
+
+# Version de l'arborescence, partagée entre processus par le cache Django : ce cache doit
+# être commun à tous les workers (un LocMemCache limite l'invalidation au processus courant)
+HIERARCHY_VERSION_KEY = "request_ddi:hierarchy_version"
+DEFAULT_HIERARCHY_TIMEOUT = 300
+
+CollectionNode = namedtuple("CollectionNode", ["id", "name"])
+SubcollectionNode = namedtuple("SubcollectionNode", ["id", "name", "collection_id"])
+SurveyNode = namedtuple(
+    "SurveyNode", ["id", "name", "subcollection_id", "collection_id", "start_year"]
+)
+
+
+def _natural_sort(nodes):
+    """Trie les noeuds par nom en ordre naturel (ex. 'vague 2' avant 'vague 10')."""
+    return tuple(sorted(nodes, key=lambda node: alphanum_key(node.name)))
+
+
+def _to_ids(values):
+    """Convertit des identifiants (chaînes ou entiers) en ensemble d'entiers."""
+    if not values:
+        return set()
+    return {int(value) for value in values if str(value).isdigit()}
+
+
+class HierarchySnapshot:
+    """
+    Photographie immuable de l'arborescence collection → sous-collection → enquête.
+
+    Les listes sont déjà triées en ordre naturel et les années de début sont indexées,
+    de sorte que les filtres de la page de recherche sont servis sans requête SQL.
+    """
+
+    def __init__(self, collections, subcollections, surveys):
+        self.collections = _natural_sort(collections)
+        self.subcollections = _natural_sort(subcollections)
+        self.surveys = _natural_sort(surveys)
+
+    @classmethod
+    def build(cls):
+        collections = [
+            CollectionNode(*values)
+            for values in Collection.objects.order_by("name").values_list("id", "name")
+        ]
+        subcollections = [
+            SubcollectionNode(*values)
+            for values in Subcollection.objects.order_by("name").values_list(
+                "id", "name", "collection_id"
+            )
+        ]
+        surveys = [
+            SurveyNode(*values)
+            for values in Survey.objects.order_by("name").values_list(
+                "id", "name", "subcollection_id", "subcollection__collection_id", "start_year"
+            )
+        ]
+        return cls(collections, subcollections, surveys)
+
+    def get_subcollections(self, collection_ids=None):
+        collection_ids = _to_ids(collection_ids)
+        if not collection_ids:
+            return self.subcollections
+        return tuple(sc for sc in self.subcollections if sc.collection_id in collection_ids)
+
+    def get_surveys(self, collection_ids=None, subcollection_ids=None, survey_ids=None):
+        """Enquêtes filtrées avec la même priorité que les vues : enquêtes, puis
+        sous-collections, puis collections."""
+        survey_ids = _to_ids(survey_ids)
+        subcollection_ids = _to_ids(subcollection_ids)
+        collection_ids = _to_ids(collection_ids)
+
+        if survey_ids:
+            return tuple(s for s in self.surveys if s.id in survey_ids)
+        if subcollection_ids:
+            return tuple(s for s in self.surveys if s.subcollection_id in subcollection_ids)
+        if collection_ids:
+            return tuple(s for s in self.surveys if s.collection_id in collection_ids)
+        return self.surveys
+
+    def get_years(self, collection_ids=None, subcollection_ids=None, survey_ids=None):
+        """Années de début distinctes, triées par ordre croissant."""
+        surveys = self.get_surveys(collection_ids, subcollection_ids, survey_ids)
+        return sorted({s.start_year for s in surveys if s.start_year is not None})
+
+    def get_decades(
+        self, collection_ids=None, subcollection_ids=None, survey_ids=None, reverse=True
+    ):
+        """Années regroupées par décennie : {décennie: [années]}."""
+        years = self.get_years(collection_ids, subcollection_ids, survey_ids)
+        decades = {}
+        for year in sorted(years, reverse=reverse):
+            decades.setdefault((year // 10) * 10, []).append(year)
+        return decades
+
+
+_lock = threading.Lock()
+_snapshot = None
+_snapshot_version = None
+_snapshot_built_at = 0.0
+
+
+def _fresh_snapshot():
+    """Photographie du processus si elle est encore à jour, sinon None."""
+    timeout = getattr(settings, "HIERARCHY_CACHE_TIMEOUT", DEFAULT_HIERARCHY_TIMEOUT)
+    snapshot = _snapshot
+    if (
+        snapshot is not None
+        and cache.get(HIERARCHY_VERSION_KEY) == _snapshot_version
+        and time.monotonic() - _snapshot_built_at < timeout
+    ):
+        return snapshot
+    return None
+
+
+def get_hierarchy():
+    """
+    Retourne la photographie de l'arborescence du processus, reconstruite si elle a été
+    invalidée (y compris par un autre worker partageant le cache Django) ou si elle a
+    dépassé HIERARCHY_CACHE_TIMEOUT secondes.
+    """
+    global _snapshot, _snapshot_version, _snapshot_built_at
+
+    snapshot = _fresh_snapshot()
+    if snapshot is not None:
+        return snapshot
+
+    with _lock:
+        # Reconstruite entre-temps par un autre thread en attente du verrou ?
+        snapshot = _fresh_snapshot()
+        if snapshot is not None:
+            return snapshot
+        version = cache.get(HIERARCHY_VERSION_KEY)
+        snapshot = HierarchySnapshot.build()
+        _snapshot, _snapshot_version, _snapshot_built_at = snapshot, version, time.monotonic()
+    return snapshot
+
+
+def invalidate_hierarchy():
+    """Invalide la photographie de l'arborescence pour tous les processus."""
+    global _snapshot  # noqa: PLW0603
+
+    _snapshot = None
+    cache.set(HIERARCHY_VERSION_KEY, uuid.uuid4().hex, None)
@@ -1,11 +1,15 @@
 # -- STDLIB
+import hashlib
 from collections import defaultdict
 
 # -- DJANGO
 from django.db import models
+from django.db.models import F, Q
+from django.db.models.functions import MD5
 
 # -- REQUEST_DDI (LOCAL)
-from request_ddi.utils.normalize_string import normalize_string_for_comparison
+from request_ddi.utils.normalize_string import normalize_many, normalize_string_for_comparison
+from request_ddi.utils.sort import category_sort_key
 
 
 class Distributor(models.Model):
@@ -42,6 +46,10 @@ class Survey(models.Model):
     author = models.CharField(max_length=510, null=True, blank=True)
     producer = models.CharField(max_length=510, null=True, blank=True)
     start_date = models.DateField(null=True, blank=True)
+    # Année de start_date, indexée pour les filtres et regroupements par année / décennie
+    start_year = models.PositiveSmallIntegerField(
+        null=True, blank=True, editable=False, db_index=True
+    )
     geographic_coverage = models.CharField(max_length=510, null=True, blank=True)
     geographic_unit = models.CharField(max_length=510, null=True, blank=True)
     unit_of_analysis = models.CharField(max_length=510, null=True, blank=True)
@@ -51,6 +59,16 @@ class Survey(models.Model):
     def __str__(self):
         return f"{self.name}"
 
+    def save(self, *args, **kwargs):
+        self.fill_start_year()
+        super().save(*args, **kwargs)
+
+    def fill_start_year(self):
+        """Renseigne start_year ; à appeler explicitement avant un bulk_create / bulk_update."""
+        # start_date peut encore être une chaîne "AAAA-MM-JJ" à ce stade
+        self.start_date = self._meta.get_field("start_date").to_python(self.start_date)
+        self.start_year = self.start_date.year if self.start_date else None
+
 
 class ConceptualVariable(models.Model):
     internal_label = models.TextField()
@@ -58,6 +76,8 @@ class ConceptualVariable(models.Model):
         "Concept", symmetrical=False, related_name="conceptual_variables"
     )
     is_unique = models.BooleanField(default=False)
+    # Cache des ids (triés) des bindings du concept, None tant qu'il n'est pas calculé
+    sibling_binding_ids = models.JSONField(null=True, blank=True, editable=False)
 
     def __str__(self):
         # Récupérer toutes les variables représentées associées
@@ -72,6 +92,37 @@ class ConceptualVariable(models.Model):
         else:
             return f"Conceptual Variable: {self.internal_label} (No linked represented variables)"
 
+    def get_sibling_binding_ids(self):
+        """Ids des bindings de toutes les variables représentées du concept (cf. cache)."""
+        if self.sibling_binding_ids is None:
+            self.sibling_binding_ids = list(
+                BindingSurveyRepresentedVariable.objects.filter(variable__conceptual_var=self)
+                .order_by("id")
+                .values_list("id", flat=True)
+            )
+            ConceptualVariable.objects.filter(pk=self.pk).update(
+                sibling_binding_ids=self.sibling_binding_ids
+            )
+        return self.sibling_binding_ids
+
+
+class CategoryQuerySet(models.QuerySet):
+    """bulk_create et bulk_update n'appellent pas save() : la clé de tri est calculée ici."""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for category in objs:
+            category.fill_sort_key()
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        if "code" in fields:
+            objs = list(objs)
+            for category in objs:
+                category.fill_sort_key()
+            fields = [*fields, "sort_key"]
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
 
 class Category(models.Model):
     """careful when editing a category, most of the time we should be creating a new one instead"""
@@ -79,16 +130,50 @@ class Category(models.Model):
     code = models.CharField(max_length=255)
     category_label = models.TextField(null=True)
     missing = models.BooleanField(default=False)
+    # Calculée à l'enregistrement, cf. category_sort_key
+    sort_key = models.CharField(max_length=520, default="", editable=False)
+
+    objects = CategoryQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.code} : {self.category_label}"
 
+    def save(self, *args, **kwargs):
+        self.fill_sort_key()
+        super().save(*args, **kwargs)
+
+    def fill_sort_key(self):
+        """Renseigne sort_key à partir du code (cf. category_sort_key)."""
+        self.sort_key = category_sort_key(self.code)
+
+    @classmethod
+    def get_or_create_by_label(cls, code, category_label):
+        """
+        get_or_create sur (code, libellé) : le filtre supplémentaire sur MD5(libellé)
+        permet d'utiliser l'index (code, MD5(libellé)) plutôt que l'index sur le texte brut.
+        Un libellé absent (NULL, sans MD5) est recherché par un get_or_create simple.
+        """
+        if category_label is None:
+            return cls.objects.get_or_create(code=code, category_label=None)
+        label_md5 = hashlib.md5(category_label.encode("utf-8"), usedforsecurity=False).hexdigest()
+        return cls.objects.alias(label_md5=MD5("category_label")).get_or_create(
+            code=code,
+            category_label=category_label,
+            # Le suffixe __exact exclut ce filtre des champs utilisés à la création
+            label_md5__exact=label_md5,
+        )
+
     class Meta:
+        ordering = ["sort_key"]  # noqa: RUF012
         constraints = [  # noqa: RUF012
             models.UniqueConstraint(
                 fields=["code", "category_label"], name="unique_code_category_link"
             )
         ]
+        indexes = [  # noqa: RUF012
+            # Index compact pour les recherches (code, libellé), cf. get_or_create_by_label()
+            models.Index(F("code"), MD5("category_label"), name="request_ddi_category_md5_idx"),
+        ]
 
 
 class RepresentedVariable(models.Model):
@@ -124,6 +209,8 @@ class RepresentedVariable(models.Model):
         ),
     )
     is_unique = models.BooleanField(default=False)
+    # Cache des ids (triés) des bindings de la variable, None tant qu'il n'est pas calculé
+    sibling_binding_ids = models.JSONField(null=True, blank=True, editable=False)
 
     def __str__(self):
         return (
@@ -131,18 +218,77 @@ class RepresentedVariable(models.Model):
             + f"({self.type}, {self.question_text})"
         )
 
+    @property
+    def ordered_categories(self):
+        """
+        Catégories triées par sort_key. L'ordre vient de Category.Meta.ordering,
+        ce qui permet de réutiliser un éventuel prefetch_related sans nouveau tri.
+        """
+        return self.categories.all()
+
     @classmethod
     def get_cleaned_question_texts(cls):
         """
         Retourne un dictionnaire : texte nettoyé → liste des variables ayant ce texte.
         Utile pour identifier toutes les variables représentées ayant la même question.
+        Les textes sont normalisés en lot (cf. normalize_many).
         """
+        variables = list(cls.objects.all())
+        keys = normalize_many(
+            [var.question_text for var in variables], normalize_string_for_comparison
+        )
         cleaned = defaultdict(list)
-        for var in cls.objects.all():
-            key = normalize_string_for_comparison(var.question_text)
+        for key, var in zip(keys, variables):
             cleaned[key].append(var)
         return dict(cleaned)
 
+    def get_sibling_binding_ids(self):
+        """Ids des bindings de la variable, calculés à la première lecture puis mis en cache."""
+        if self.sibling_binding_ids is None:
+            self.sibling_binding_ids = list(
+                self.bindingsurveyrepresentedvariable_set.order_by("id").values_list(
+                    "id", flat=True
+                )
+            )
+            RepresentedVariable.objects.filter(pk=self.pk).update(
+                sibling_binding_ids=self.sibling_binding_ids
+            )
+        return self.sibling_binding_ids
+
+    @classmethod
+    def refresh_sibling_binding_ids(cls, variable_ids):
+        """
+        Recalcule en une lecture le cache des bindings des variables données et de
+        leurs variables conceptuelles (appelé par l'import après chaque enquête).
+        """
+        variables = list(cls.objects.filter(id__in=variable_ids).only("id", "conceptual_var_id"))
+        conceptual_ids = {variable.conceptual_var_id for variable in variables}
+
+        by_variable = defaultdict(list)
+        by_concept = defaultdict(list)
+        bindings = (
+            BindingSurveyRepresentedVariable.objects.filter(
+                variable__conceptual_var_id__in=conceptual_ids
+            )
+            .order_by("id")
+            .values_list("id", "variable_id", "variable__conceptual_var_id")
+        )
+        for binding_id, variable_id, conceptual_id in bindings:
+            by_variable[variable_id].append(binding_id)
+            by_concept[conceptual_id].append(binding_id)
+
+        for variable in variables:
+            variable.sibling_binding_ids = by_variable[variable.id]
+        cls.objects.bulk_update(variables, ["sibling_binding_ids"], batch_size=500)
+        ConceptualVariable.objects.bulk_update(
+            [
+                ConceptualVariable(id=conceptual_id, sibling_binding_ids=by_concept[conceptual_id])
+                for conceptual_id in conceptual_ids
+            ],
+            ["sibling_binding_ids"],
+            batch_size=500,
+        )
+
 
 class BindingSurveyRepresentedVariable(models.Model):
     survey = models.ForeignKey(Survey, on_delete=models.CASCADE)
@@ -151,6 +297,8 @@ class BindingSurveyRepresentedVariable(models.Model):
     variable_name = models.TextField()
     universe = models.TextField()
     is_indexed = models.BooleanField(default=False)
+    # Empreinte de la variable telle que lue dans le dernier XML importé (import incrémental)
+    content_hash = models.CharField(max_length=64, blank=True, default="", editable=False)
 
     class Meta:
         constraints = [  # noqa: RUF012
@@ -159,6 +307,13 @@ class BindingSurveyRepresentedVariable(models.Model):
                 name="unique_variable_name_per_survey",
             )
         ]
+        indexes = [  # noqa: RUF012
+            models.Index(fields=["variable_name"], name="request_ddi_binding_varname"),
+            # Index partiel : seuls les bindings restant à indexer dans Elasticsearch
+            models.Index(
+                fields=["id"], condition=Q(is_indexed=False), name="request_ddi_binding_unindexed"
+            ),
+        ]
 
     def __str__(self):
         return f"Binding: {self.variable_name} - Survey: {self.survey.name}"
@@ -193,3 +348,26 @@ class BindingVariableCategoryStat(models.Model):
 
     def __str__(self):
         return f"{self.binding.variable_name} - {self.category.code}: {self.stat}"
+
+
+class ImportedFile(models.Model):
+    """Fichier XML déjà importé, reconnu à son empreinte avant toute analyse."""
+
+    sha256 = models.CharField(max_length=64, unique=True)
+    file_name = models.CharField(max_length=510)
+    survey = models.ForeignKey(Survey, on_delete=models.CASCADE, null=True, blank=True)
+    imported_at = models.DateTimeField()
+    # Bilan de l'import au cours duquel le fichier a été traité
+    summary = models.JSONField(default=dict)
+
+    def __str__(self):
+        return f"{self.file_name} ({self.imported_at:%Y-%m-%d %H:%M})"
+
+    @staticmethod
+    def hash_file(uploaded_file):
+        """Empreinte SHA-256 d'un fichier envoyé, lu par blocs puis rembobiné."""
+        digest = hashlib.sha256()
+        for chunk in uploaded_file.chunks():
+            digest.update(chunk)
+        uploaded_file.seek(0)
+        return digest.hexdigest()
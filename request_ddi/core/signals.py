@@ -1,7 +1,10 @@
 # -- DJANGO
+import contextlib
+import contextvars
 import logging
 
-from django.db.models.signals import post_delete, post_save
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save
 from django.dispatch import receiver
 
 # -- THIRDPARTY
@@ -9,13 +12,34 @@ from elasticsearch import NotFoundError
 
 # -- REQUEST_DDI (LOCAL)
 from .documents import BindingSurveyDocument
+from .export_snapshots import invalidate_export_snapshots_on_commit
+from .hierarchy import invalidate_hierarchy
 from .models import (
     BindingSurveyRepresentedVariable,
+    Category,
+    Collection,
+    ConceptualVariable,
     RepresentedVariable,
+    Subcollection,
+    Survey,
 )
 
 logger = logging.getLogger(__name__)
 
+# Vrai pendant un import XML (cf. DataImporter.import_data), qui recalcule lui-même en bloc
+# les caches de bindings frères des variables touchées
+importing = contextvars.ContextVar("importing", default=False)
+
+
+@contextlib.contextmanager
+def import_in_progress():
+    """Marque le contexte courant comme import en cours (utilisable en décorateur)."""
+    token = importing.set(True)
+    try:
+        yield
+    finally:
+        importing.reset(token)
+
 
 @receiver(post_save, sender=BindingSurveyRepresentedVariable)
 def update_index(sender, instance, **kwargs):
@@ -32,6 +56,64 @@ def delete_index(sender, instance, **kwargs):
         pass
 
 
+@receiver([post_save, post_delete], sender=Collection)
+@receiver([post_save, post_delete], sender=Subcollection)
+@receiver([post_save, post_delete], sender=Survey)
+def invalidate_hierarchy_cache(sender, instance, **kwargs):
+    """Invalide l'arborescence en cache dès la modification, puis à nouveau au commit
+    pour écarter une photographie reconstruite entre-temps sans les données validées."""
+    invalidate_hierarchy()
+    transaction.on_commit(invalidate_hierarchy)
+
+
+@receiver([post_save, post_delete], sender=BindingSurveyRepresentedVariable)
+@receiver([post_save, post_delete], sender=RepresentedVariable)
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Survey)
+@receiver([post_save, post_delete], sender=Collection)
+@receiver([post_save, post_delete], sender=Subcollection)
+@receiver(m2m_changed, sender=RepresentedVariable.categories.through)
+def invalidate_export_snapshots_on_change(sender, instance, **kwargs):
+    """
+    Les exports pré-générés ne sont plus servis dès que les données exportées changent
+    (au commit, une fois par transaction).
+    """
+    invalidate_export_snapshots_on_commit()
+
+
+@receiver(post_init, sender=BindingSurveyRepresentedVariable)
+def remember_binding_variable(sender, instance, **kwargs):
+    """Retient la variable du binding chargé, pour détecter un changement à l'enregistrement."""
+    # __dict__ : un champ différé (only(), defer()) ne doit pas déclencher de requête
+    instance._saved_variable_id = instance.__dict__.get("variable_id")
+
+
+@receiver([post_save, post_delete], sender=BindingSurveyRepresentedVariable)
+def invalidate_sibling_binding_ids(sender, instance, created=None, **kwargs):
+    """
+    Vide le cache des bindings frères des variables (et de leurs concepts) dont la liste de
+    bindings change : création ou suppression d'un binding (created vaut None pour
+    post_delete), ou changement de variable, auquel cas l'ancienne est aussi concernée.
+    Ignoré pendant un import, qui les recalcule en bloc ; sinon recalculés à la lecture.
+    """
+    previous_variable_id = instance._saved_variable_id
+    instance._saved_variable_id = instance.variable_id
+    if importing.get():
+        return
+
+    if created is False:
+        if previous_variable_id == instance.variable_id:
+            return
+        variable_ids = {previous_variable_id, instance.variable_id} - {None}
+    else:
+        variable_ids = {instance.variable_id}
+
+    RepresentedVariable.objects.filter(pk__in=variable_ids).update(sibling_binding_ids=None)
+    ConceptualVariable.objects.filter(representedvariable__in=variable_ids).update(
+        sibling_binding_ids=None
+    )
+
+
 def delete_represented_variable_if_unused(represented_variable):
     """Supprime une variable représentée et ses dépendances si elles ne sont plus utilisées."""
     categories = represented_variable.categories.all()
@@ -0,0 +1,217 @@
+# -- STDLIB
+import contextlib
+import csv
+import glob
+import io
+import json
+import logging
+import os
+import platform
+import re
+import time
+from unittest import mock
+
+# -- DJANGO
+import django
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+# -- REQUEST_DDI
+from request_ddi.core.data_importer import DataImporter
+from request_ddi.core.documents import BindingSurveyDocument
+from request_ddi.core.models import Survey
+from request_ddi.core.parser import XMLParser
+from request_ddi.utils.codebooks import TEST_FILES_DIR
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_METADATA = os.path.join(TEST_FILES_DIR, "data_EA_19_to_23_complete.csv")
+# Identifiant DDI sans préfixe "doi:" (cas des codebooks ELIPSS fournis)
+IDNO_WITHOUT_DOI_RE = re.compile(rb"(<IDNo[^>]*>\s*)(?!doi:)(?=\S)")
+
+
+def as_doi(identifier):
+    """Préfixe l'identifiant par "doi:", format attendu par l'import."""
+    identifier = identifier.strip()
+    return identifier if identifier.startswith("doi:") else f"doi:{identifier}"
+
+
+class QueryCounter:
+    """Compte les requêtes SQL exécutées (sans la limite de taille de connection.queries)."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class ElasticsearchStub:
+    """
+    Remplace le client Elasticsearch des documents : les envois bulk sont préparés comme
+    pour un vrai index (sérialisation et requêtes SQL comprises), puis seulement comptés.
+    """
+
+    def __init__(self):
+        self.bulk_calls = 0
+        self.documents = 0
+
+    def bulk(self, client, actions, **kwargs):
+        self.bulk_calls += 1
+        self.documents += sum(1 for _ in actions)
+        return self.documents, []
+
+    def get(self, **kwargs):
+        return {}
+
+    def delete(self, **kwargs):
+        return {}
+
+    def __enter__(self):
+        self._patchers = [
+            mock.patch.object(BindingSurveyDocument, "_get_connection", lambda *args: self),
+            mock.patch("request_ddi.core.documents.bulk", self.bulk),
+        ]
+        for patcher in self._patchers:
+            patcher.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        for patcher in self._patchers:
+            patcher.stop()
+
+
+@contextlib.contextmanager
+def cache_invalidation_disabled():
+    """
+    Neutralise les récepteurs qui invalident les exports pré-générés et l'arborescence en
+    cache : ces invalidations, hors base de données, survivraient à l'annulation des données.
+    """
+    with (
+        mock.patch("request_ddi.core.signals.invalidate_export_snapshots_on_commit"),
+        mock.patch("request_ddi.core.signals.invalidate_hierarchy"),
+    ):
+        yield
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark reproductible de l'import : crée les enquêtes du CSV de métadonnées puis "
+        "importe les codebooks XML (par défaut les fichiers de test fournis) avec un "
+        "Elasticsearch simulé, et écrit par fichier les temps, requêtes SQL et envois bulk en JSON. "
+        "Les données importées sont annulées en fin de benchmark, sauf avec --keep."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="*", help="Fichiers XML (défaut : test_files/*.xml)")
+        parser.add_argument(
+            "--metadata",
+            default=DEFAULT_METADATA,
+            help="CSV donnant les enquêtes (ddi ou doi, title)",
+        )
+        parser.add_argument("--output", help="Fichier JSON de résultats (défaut : sortie standard)")
+        parser.add_argument("--label", help="Étiquette du run (ex. hash du commit)")
+        parser.add_argument(
+            "--keep", action="store_true", help="Conserve les données importées en base"
+        )
+
+    def handle(self, *args, **options):
+        paths = options["paths"] or sorted(glob.glob(os.path.join(TEST_FILES_DIR, "*.xml")))
+        results = {
+            "label": options["label"],
+            "generated_at": timezone.now().isoformat(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+        }
+
+        # Données conservées (--keep) : les caches doivent bien être invalidés au commit
+        keep_caches = contextlib.nullcontext() if options["keep"] else cache_invalidation_disabled()
+        with ElasticsearchStub() as stub, keep_caches, transaction.atomic():
+            results["metadata"] = self.load_metadata(options["metadata"])
+            results["files"] = [self.import_file(path, stub) for path in paths]
+            if not options["keep"]:
+                transaction.set_rollback(True)
+
+        results["total"] = {
+            key: round(sum(result.get(key, 0) for result in results["files"]), 4)
+            for key in ("variables", "parse_seconds", "import_seconds", "queries", "es_bulk_calls")
+        }
+
+        output = json.dumps(results, indent=2, ensure_ascii=False)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as output_file:
+                output_file.write(output)
+            self.stdout.write(self.style.SUCCESS(f"Résultats écrits dans {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+    def load_metadata(self, path):
+        """
+        Crée les enquêtes décrites par le CSV : colonnes ddi et title (CSV des variables) ou
+        doi et title (CSV des enquêtes, ex. généré par generate_synthetic_catalogue).
+        """
+        start_time = time.perf_counter()
+        queries = QueryCounter()
+        with connection.execute_wrapper(queries):
+            with open(path, encoding="utf-8", newline="") as csv_file:
+                surveys = {
+                    as_doi(row.get("ddi") or row["doi"]): row["title"]
+                    for row in csv.DictReader(csv_file)
+                }
+            for doi, title in surveys.items():
+                Survey.objects.get_or_create(external_ref=doi, defaults={"name": title})
+        return {
+            "file": os.path.basename(path),
+            "surveys": len(surveys),
+            "seconds": round(time.perf_counter() - start_time, 4),
+            "queries": queries.count,
+        }
+
+    def import_file(self, path, stub):
+        name = os.path.basename(path)
+        with open(path, "rb") as codebook:
+            xml_file = io.BytesIO(IDNO_WITHOUT_DOI_RE.sub(rb"\1doi:", codebook.read()))
+        xml_file.name = name
+
+        start_time = time.perf_counter()
+        parser = XMLParser()
+        question_datas = parser.parse_file(xml_file, set()) or []
+        result = {
+            "file": name,
+            "variables": len(question_datas),
+            "parse_seconds": round(time.perf_counter() - start_time, 4),
+        }
+        if parser.errors:
+            result["errors"] = parser.errors
+            return result
+
+        bulk_calls, documents = stub.bulk_calls, stub.documents
+        start_time = time.perf_counter()
+        queries = QueryCounter()
+        with connection.execute_wrapper(queries):
+            try:
+                # Point de sauvegarde : un échec n'interrompt pas les fichiers suivants
+                with transaction.atomic():
+                    _, num_new_variables, num_new_bindings = DataImporter().import_data(
+                        question_datas
+                    )
+                result.update(
+                    num_new_variables=num_new_variables, num_new_bindings=num_new_bindings
+                )
+            except Exception as e:
+                logger.exception("❌ Échec de l'import de %s", name)
+                result["errors"] = [str(e)]
+        result.update(
+            import_seconds=round(time.perf_counter() - start_time, 4),
+            queries=queries.count,
+            es_bulk_calls=stub.bulk_calls - bulk_calls,
+            es_documents=stub.documents - documents,
+        )
+        self.stderr.write(
+            f"{name} : {result['variables']} variables, parse {result['parse_seconds']} s, "
+            f"import {result['import_seconds']} s, {result['queries']} requêtes"
+        )
+        return result
@@ -0,0 +1,68 @@
+# -- STDLIB
+import glob
+import os
+import time
+
+# -- THIRDPARTY
+from bs4 import BeautifulSoup
+
+# -- DJANGO
+from django.core.management.base import BaseCommand
+
+# -- REQUEST_DDI
+from request_ddi.utils.codebooks import TEST_FILES_DIR
+from request_ddi.utils.normalize_string import (
+    clear_normalize_cache,
+    normalize_string_for_comparison,
+    normalize_string_for_database,
+)
+
+# Balises dont le texte est normalisé lors de l'import (libellés, questions, catégories...)
+NORMALIZED_TAGS = ["labl", "qstnLit", "universe", "notes"]
+
+
+def codebook_strings(paths):
+    """Textes des codebooks DDI donnés, tels que l'import les normalise."""
+    strings = []
+    for path in paths:
+        with open(path, "rb") as xml_file:
+            soup = BeautifulSoup(xml_file.read(), "xml")
+        strings.extend(tag.text.strip() for tag in soup.find_all(NORMALIZED_TAGS))
+    return strings
+
+
+class Command(BaseCommand):
+    help = (
+        "Micro-benchmark de la normalisation des chaînes sur des codebooks DDI "
+        "(par défaut les fichiers de test fournis), à froid puis avec le cache"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="*", help="Fichiers XML (défaut : test_files/*.xml)")
+        parser.add_argument(
+            "--repeat", type=int, default=5, help="Nombre de passages avec le cache"
+        )
+
+    def handle(self, *args, **options):
+        paths = options["paths"] or sorted(glob.glob(os.path.join(TEST_FILES_DIR, "*.xml")))
+        strings = codebook_strings(paths)
+        self.stdout.write(f"{len(strings)} chaînes extraites de {len(paths)} fichier(s)")
+
+        # Enchaînement utilisé par l'import : base de données puis comparaison
+        def normalize_all():
+            for value in strings:
+                normalize_string_for_comparison(normalize_string_for_database(value))
+
+        clear_normalize_cache()
+        start_time = time.perf_counter()
+        normalize_all()
+        cold = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        for _ in range(options["repeat"]):
+            normalize_all()
+        warm = (time.perf_counter() - start_time) / max(options["repeat"], 1)
+
+        per_string = 1e6 / max(len(strings), 1)
+        self.stdout.write(f"À froid : {cold:.4f} s ({cold * per_string:.2f} µs / chaîne)")
+        self.stdout.write(f"Avec cache : {warm:.4f} s ({warm * per_string:.2f} µs / chaîne)")
@@ -19,6 +19,7 @@ from request_ddi.core.models import (
     Concept,
     ConceptualVariable,
     Distributor,
+    ImportedFile,
     RepresentedVariable,
     Subcollection,
     Survey,
@@ -41,6 +42,7 @@ class Command(BaseCommand):
 
         # --- Suppression des données ---
         models_to_delete = [
+            (ImportedFile, "ImportedFile"),
             (BindingConcept, "BindingConcept"),
             (BindingSurveyRepresentedVariable, "BindingSurveyRepresentedVariable"),
             (Category, "Category"),
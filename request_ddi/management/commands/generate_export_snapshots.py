@@ -0,0 +1,87 @@
+# -- STDLIB
+import logging
+import os
+import time
+
+# -- DJANGO
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# -- REQUEST_DDI
+from request_ddi.core.export_snapshots import (
+    invalidate_export_snapshots,
+    snapshot_key,
+    snapshot_version,
+    write_manifest,
+    write_snapshot,
+)
+from request_ddi.core.models import Collection
+from request_ddi.views.export_views import ExportQuestionsCSVView
+
+logger = logging.getLogger(__name__)
+
+# Nombre de générations tentées si les données changent pendant la génération
+MAX_ATTEMPTS = 3
+
+
+class Command(BaseCommand):
+    help = (
+        "Génère sur disque l'export CSV complet et un export par collection, servis ensuite "
+        "directement par la vue d'export (à lancer après les imports, ex. chaque nuit)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--no-collections",
+            action="store_true",
+            help="Ne génère que l'export complet",
+        )
+
+    def handle(self, *args, **options):
+        start_time = time.time()
+        os.makedirs(settings.EXPORT_SNAPSHOTS_DIR, exist_ok=True)
+
+        # Les anciens exports ne sont plus servis pendant la génération
+        invalidate_export_snapshots()
+
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            # Toute modification validée pendant la génération renouvelle ce jeton ; le
+            # manifeste le porte, il n'est donc plus servi après une invalidation même
+            # survenue après cette vérification
+            version = snapshot_version()
+            files = self.generate(options["no_collections"])
+            if snapshot_version() == version:
+                write_manifest(files, version)
+                break
+            logger.warning(
+                "⚠️ Données modifiées pendant la génération des exports (essai %s/%s)",
+                attempt,
+                MAX_ATTEMPTS,
+            )
+        else:
+            msg = (
+                f"Les données ont changé pendant chacune des {MAX_ATTEMPTS} générations : "
+                "exports non publiés."
+            )
+            raise CommandError(msg)
+
+        duration = time.time() - start_time
+        logger.info("%s exports pré-générés en %.2f secondes.", len(files), duration)
+        self.stdout.write(
+            self.style.SUCCESS(f"{len(files)} exports générés dans {settings.EXPORT_SNAPSHOTS_DIR}")
+        )
+
+    def generate(self, no_collections):
+        """Écrit l'export complet et ceux des collections ; retourne les entrées du manifeste."""
+        view = ExportQuestionsCSVView()
+        collection_ids = [None]
+        if not no_collections:
+            collection_ids += list(Collection.objects.order_by("id").values_list("id", flat=True))
+
+        files = {}
+        for collection_id in collection_ids:
+            files[snapshot_key(collection_id)] = write_snapshot(
+                collection_id, view.snapshot_lines(collection_id)
+            )
+            self.stdout.write(f"Export {snapshot_key(collection_id)} généré")
+        return files
@@ -0,0 +1,378 @@
+# -- STDLIB
+import csv
+import os
+import random
+from xml.sax.saxutils import escape, quoteattr
+
+# -- DJANGO
+from django.core.management.base import BaseCommand, CommandError
+
+# Taille actuelle du catalogue de production (≈ 65 000 variables sur 250 enquêtes)
+DEFAULT_SURVEYS = 250
+DEFAULT_VARIABLES = 260
+
+METADATA_COLUMNS = [
+    "doi",
+    "xml_lang",
+    "title",
+    "author",
+    "producer",
+    "distributor",
+    "start_date",
+    "geographic_coverage",
+    "geographic_unit",
+    "unit_of_analysis",
+    "contact",
+    "date_last_version",
+    "collection",
+    "sous-collection",
+]
+
+# Proportions utilisées pour les tirages
+SERIES_QUESTION_RATE = 0.8  # questions de la série reconduites à chaque vague
+SERIES_CATEGORIES_RATE = 0.85  # questions de série avec modalités de réponse
+WAVE_CATEGORIES_RATE = 0.7  # questions propres à une vague avec modalités
+MISSING_CODES_RATE = 0.5  # variables à modalités avec codes de non-réponse
+NOTES_RATE = 0.15  # variables avec une note
+SHORT_NOTES_RATE = 0.8  # parmi les notes, notes courtes (sinon plusieurs paragraphes)
+UNIVERSE_RATE = 0.3  # variables avec un univers
+
+# Échelles de réponse partagées par de nombreuses questions, d'une enquête à l'autre
+LIKERT_SCALES = [
+    ["Tout à fait d'accord", "Plutôt d'accord", "Plutôt pas d'accord", "Pas du tout d'accord"],
+    ["Très satisfait", "Plutôt satisfait", "Plutôt pas satisfait", "Pas du tout satisfait"],
+    ["Beaucoup", "Assez", "Peu", "Pas du tout"],
+    ["Souvent", "De temps en temps", "Rarement", "Jamais"],
+    ["Oui", "Non"],
+    ["Très confiance", "Plutôt confiance", "Plutôt pas confiance", "Pas du tout confiance"],
+    ["Très important", "Assez important", "Peu important", "Pas du tout important"],
+]
+# Codes de non-réponse (attribut missing="Y" dans le DDI)
+MISSING_CODES = [("96", "Ne sait pas"), ("97", "Ne veut pas répondre"), ("99", "Non concerné")]
+
+# Questions socio-démographiques communes à toutes les séries
+COMMON_QUESTIONS = [
+    ("Sexe", "Vous êtes…", ["Un homme", "Une femme"]),
+    ("Âge", "Quel est votre âge ?", None),
+    (
+        "Diplôme",
+        "Quel est le diplôme le plus élevé que vous ayez obtenu ?",
+        [
+            "Aucun diplôme",
+            "CAP, BEP",
+            "Baccalauréat",
+            "Bac +2",
+            "Bac +3 et plus",
+        ],
+    ),
+    (
+        "Situation professionnelle",
+        "Quelle est votre situation professionnelle actuelle ?",
+        [
+            "En emploi",
+            "Au chômage",
+            "Retraité(e)",
+            "Étudiant(e)",
+            "Autre situation",
+        ],
+    ),
+    ("Taille du foyer", "Combien de personnes vivent dans votre foyer, vous compris ?", None),
+    (
+        "Région",
+        "Dans quelle région habitez-vous ?",
+        [
+            "Île-de-France",
+            "Nord-Est",
+            "Nord-Ouest",
+            "Sud-Est",
+            "Sud-Ouest",
+        ],
+    ),
+]
+
+TOPICS = [
+    "l'Union européenne",
+    "la justice",
+    "l'école",
+    "les médias",
+    "la police",
+    "l'hôpital",
+    "les partis politiques",
+    "le gouvernement",
+    "les syndicats",
+    "les entreprises",
+    "la science",
+    "l'armée",
+    "les associations",
+    "les élus locaux",
+    "la religion",
+    "l'environnement",
+    "Internet",
+    "les banques",
+    "la famille",
+    "le travail",
+    "les voisins",
+    "la culture",
+    "le sport",
+    "les transports en commun",
+    "la santé",
+    "le logement",
+    "l'immigration",
+    "les impôts",
+    "la sécurité sociale",
+    "les réseaux sociaux",
+]
+TEMPLATES = [
+    "Quelle confiance accordez-vous à {topic} ?",
+    "Êtes-vous d'accord avec l'affirmation suivante : « {Topic} fonctionne bien » ?",
+    "Dans quelle mesure êtes-vous satisfait(e) de {topic} ?",
+    "À quelle fréquence vous informez-vous sur {topic} ?",
+    "Selon vous, {topic} joue-t-il un rôle important dans la société ?",
+    "Au cours des 12 derniers mois, avez-vous eu affaire à {topic} ?",
+    "Diriez-vous que {topic} s'est amélioré ces dernières années ?",
+    "Quelle importance accordez-vous à {topic} dans votre vie quotidienne ?",
+]
+QUALIFIERS = [
+    "",
+    "en France",
+    "dans votre commune",
+    "pour les jeunes",
+    "pour les personnes âgées",
+    "en période de crise",
+    "par rapport à il y a dix ans",
+]
+UNIVERSES = [
+    "Ensemble des répondants",
+    "Répondants en emploi",
+    "Répondants ayant au moins un enfant",
+    "Répondants de 18 ans et plus",
+]
+NOTE_SENTENCES = [
+    "La formulation de la question a été modifiée par rapport à la vague précédente.",
+    "Les modalités ont été présentées dans un ordre aléatoire.",
+    "Cette question n'a été posée qu'aux répondants ayant répondu « Oui » à la question filtre.",
+    "Variable recodée à partir des réponses ouvertes ; voir la documentation méthodologique.",
+    "Le libellé affiché à l'écran dépendait du sexe du répondant.",
+    "Les réponses « Ne sait pas » étaient proposées spontanément, sans être lues.",
+    "Le module a été financé par un partenaire extérieur et reconduit chaque année.",
+]
+
+
+class CatalogueGenerator:
+    """
+    Génère un catalogue DDI synthétique mais réaliste : les enquêtes sont regroupées en
+    séries de vagues qui reprennent les mêmes questions d'une année sur l'autre, avec des
+    échelles de réponse partagées, des codes de non-réponse et des notes parfois longues.
+    Le tirage ne dépend que de la graine : deux exécutions produisent les mêmes fichiers.
+    """
+
+    def __init__(self, num_surveys, num_variables, waves=8, seed=0, first_year=2000):
+        self.num_surveys = num_surveys
+        self.num_variables = num_variables
+        self.waves = waves
+        self.seed = seed
+        self.first_year = first_year
+
+    def surveys(self):
+        """Description des enquêtes : une série toutes les `waves` enquêtes, une vague par an."""
+        for index in range(self.num_surveys):
+            series, wave = divmod(index, self.waves)
+            year = self.first_year + wave
+            code = f"syn{series + 1:03d}"
+            yield {
+                "index": index,
+                "series": series,
+                "wave": wave,
+                "year": year,
+                "code": code,
+                "doi": f"doi:10.99999/synthetic.{code}.{year}",
+                "title": f"Enquête synthétique {series + 1} - vague {wave + 1} ({year})",
+            }
+
+    def series_questions(self, series):
+        """
+        Questions d'une série, reprises à l'identique d'une vague à l'autre (la plupart des
+        variables d'une enquête en sont tirées).
+        """
+        rng = random.Random(f"{self.seed}-series-{series}")  # noqa: S311
+        questions = []
+        for number in range(self.num_variables):
+            topic = rng.choice(TOPICS)
+            qualifier = rng.choice(QUALIFIERS)
+            text = rng.choice(TEMPLATES).format(topic=topic, Topic=topic[0].upper() + topic[1:])
+            if qualifier:
+                text = f"{text[:-2]} {qualifier} ?"
+            questions.append(
+                {
+                    "key": f"q{number + 1}",
+                    "label": f"{topic[0].upper() + topic[1:]} {qualifier}".strip(),
+                    "text": text,
+                    "categories": rng.choice(LIKERT_SCALES)
+                    if rng.random() < SERIES_CATEGORIES_RATE
+                    else None,
+                }
+            )
+        return questions
+
+    def variables(self, survey, series_questions):
+        """Variables d'une vague : questions communes, questions de la série puis questions propres."""
+        rng = random.Random(f"{self.seed}-survey-{survey['index']}")  # noqa: S311
+        prefix = f"{survey['code']}_{survey['year'] % 100:02d}"
+
+        candidates = [
+            {"key": f"sd{number + 1}", "label": label, "text": text, "categories": categories}
+            for number, (label, text, categories) in enumerate(COMMON_QUESTIONS)
+        ]
+        candidates += [
+            question for question in series_questions if rng.random() < SERIES_QUESTION_RATE
+        ]
+        number = 0
+        while len(candidates) < self.num_variables:
+            number += 1
+            topic = rng.choice(TOPICS)
+            candidates.append(
+                {
+                    "key": f"v{survey['wave'] + 1}x{number}",
+                    "label": f"Module {survey['year']} - {topic}",
+                    "text": f"Question spécifique à la vague {survey['wave'] + 1} sur {topic} "
+                    f"(item {number}) ?",
+                    "categories": rng.choice(LIKERT_SCALES)
+                    if rng.random() < WAVE_CATEGORIES_RATE
+                    else None,
+                }
+            )
+
+        for question in candidates[: self.num_variables]:
+            categories = []
+            if question["categories"]:
+                categories = [
+                    (str(code), label, rng.randint(0, 2000), False)
+                    for code, label in enumerate(question["categories"], start=1)
+                ]
+                if rng.random() < MISSING_CODES_RATE:
+                    categories += [
+                        (code, label, rng.randint(0, 50), True)
+                        for code, label in MISSING_CODES[: rng.randint(1, len(MISSING_CODES))]
+                    ]
+            notes = ""
+            if rng.random() < NOTES_RATE:
+                # Quelques notes très longues, comme les consignes des enquêtes réelles
+                length = (
+                    rng.randint(1, 3) if rng.random() < SHORT_NOTES_RATE else rng.randint(15, 40)
+                )
+                notes = " ".join(rng.choice(NOTE_SENTENCES) for _ in range(length))
+            yield {
+                "name": f"{prefix}_{question['key']}",
+                "label": question["label"],
+                "text": question["text"],
+                "categories": categories,
+                "universe": rng.choice(UNIVERSES) if rng.random() < UNIVERSE_RATE else "",
+                "notes": notes,
+            }
+
+    def write_codebook(self, path, survey, series_questions):
+        """Écrit le codebook DDI d'une enquête, variable par variable."""
+        with open(path, "w", encoding="utf-8") as xml_file:
+            xml_file.write(
+                "<?xml version='1.0' encoding='UTF-8'?>\n"
+                '<codeBook version="2.5" xmlns="ddi:codebook:2_5" xml:lang="fr">\n'
+                "  <stdyDscr>\n    <citation>\n      <titlStmt>\n"
+                f"        <titl>{escape(survey['title'])}</titl>\n"
+                f'        <IDNo agency="DataCite">{escape(survey["doi"])}</IDNo>\n'
+                "      </titlStmt>\n    </citation>\n  </stdyDscr>\n"
+                "  <dataDscr>\n"
+            )
+            for number, variable in enumerate(self.variables(survey, series_questions), start=1):
+                xml_file.write(
+                    f'    <var ID="V{number}" name={quoteattr(variable["name"])}>\n'
+                    f"      <labl>{escape(variable['label'])}</labl>\n"
+                    f"      <qstn><qstnLit>{escape(variable['text'])}</qstnLit></qstn>\n"
+                )
+                if variable["universe"]:
+                    xml_file.write(f"      <universe>{escape(variable['universe'])}</universe>\n")
+                for code, label, frequency, missing in variable["categories"]:
+                    xml_file.write(
+                        "      <catgry{}><catValu>{}</catValu><labl>{}</labl>"
+                        '<catStat type="freq">{}</catStat></catgry>\n'.format(
+                            ' missing="Y"' if missing else "", code, escape(label), frequency
+                        )
+                    )
+                if variable["notes"]:
+                    xml_file.write(f"      <notes>{escape(variable['notes'])}</notes>\n")
+                xml_file.write("    </var>\n")
+            xml_file.write("  </dataDscr>\n</codeBook>\n")
+
+    def metadata_row(self, survey):
+        """Ligne du CSV de métadonnées des enquêtes (format de l'import des collections)."""
+        return {
+            "doi": survey["doi"],
+            "xml_lang": "fr",
+            "title": survey["title"],
+            "author": "Équipe synthétique",
+            "producer": "CDSP",
+            "distributor": "Catalogue synthétique",
+            "start_date": str(survey["year"]),
+            "geographic_coverage": "France",
+            "geographic_unit": "Région",
+            "unit_of_analysis": "Individu",
+            "contact": "contact@example.org",
+            "date_last_version": f"{survey['year'] + 1}-01",
+            "collection": "Synthétique",
+            "sous-collection": f"Série {survey['series'] + 1}",
+        }
+
+    def generate(self, output_dir):
+        """Écrit les codebooks et le CSV de métadonnées ; retourne les chemins produits."""
+        os.makedirs(output_dir, exist_ok=True)
+        metadata_path = os.path.join(output_dir, "surveys.csv")
+        codebooks = []
+        series_questions = {}
+        with open(metadata_path, "w", encoding="utf-8", newline="") as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames=METADATA_COLUMNS)
+            writer.writeheader()
+            for survey in self.surveys():
+                if survey["series"] not in series_questions:
+                    # Une seule série en mémoire à la fois
+                    series_questions = {survey["series"]: self.series_questions(survey["series"])}
+                path = os.path.join(output_dir, f"{survey['code']}_{survey['year']}.xml")
+                self.write_codebook(path, survey, series_questions[survey["series"]])
+                writer.writerow(self.metadata_row(survey))
+                codebooks.append(path)
+        return metadata_path, codebooks
+
+
+class Command(BaseCommand):
+    help = (
+        "Génère un catalogue DDI synthétique de N enquêtes x M variables (questions reprises "
+        "d'une vague à l'autre, échelles de Likert partagées, codes de non-réponse, notes "
+        "longues) et le CSV de métadonnées des enquêtes, pour les tests de montée en charge. "
+        f"Par défaut : {DEFAULT_SURVEYS} x {DEFAULT_VARIABLES}, la taille du catalogue actuel."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("output_dir", help="Répertoire où écrire les fichiers générés")
+        parser.add_argument(
+            "--surveys", type=int, default=DEFAULT_SURVEYS, help="Nombre d'enquêtes (N)"
+        )
+        parser.add_argument(
+            "--variables", type=int, default=DEFAULT_VARIABLES, help="Variables par enquête (M)"
+        )
+        parser.add_argument("--waves", type=int, default=8, help="Nombre de vagues par série")
+        parser.add_argument("--seed", type=int, default=0, help="Graine du générateur aléatoire")
+
+    def handle(self, *args, **options):
+        for option in ("surveys", "variables", "waves"):
+            if options[option] < 1:
+                msg = f"--{option} doit être supérieur ou égal à 1."
+                raise CommandError(msg)
+
+        generator = CatalogueGenerator(
+            options["surveys"], options["variables"], waves=options["waves"], seed=options["seed"]
+        )
+        metadata_path, codebooks = generator.generate(options["output_dir"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{len(codebooks)} codebooks ({len(codebooks) * options['variables']} variables) "
+                f"et {metadata_path} générés dans {options['output_dir']}"
+            )
+        )
@@ -0,0 +1,69 @@
+# -- STDLIB
+import logging
+import time
+
+# -- DJANGO
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+# -- REQUEST_DDI
+from request_ddi.core.documents import BindingSurveyDocument
+from request_ddi.core.export_snapshots import invalidate_export_snapshots_on_commit
+from request_ddi.core.models import BindingSurveyRepresentedVariable, RepresentedVariable
+from request_ddi.utils.normalize_string import normalize_many
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        "Renormalise le texte des questions de toutes les variables représentées "
+        "(après une évolution de normalize_string_for_database)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=1,
+            help="Nombre de processus utilisés pour la normalisation (défaut : 1)",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Compte les textes à modifier sans rien écrire en base",
+        )
+
+    def handle(self, *args, **options):
+        start_time = time.time()
+        variables = list(RepresentedVariable.objects.only("id", "question_text"))
+        texts = normalize_many(
+            [var.question_text for var in variables], processes=options["processes"]
+        )
+
+        changed = []
+        for var, text in zip(variables, texts):
+            if text != var.question_text:
+                var.question_text = text
+                changed.append(var)
+
+        if changed and not options["dry_run"]:
+            with transaction.atomic():
+                # bulk_update n'émet aucun signal : réindexation et exports à la main
+                RepresentedVariable.objects.bulk_update(
+                    changed, ["question_text"], batch_size=BATCH_SIZE
+                )
+                for start in range(0, len(changed), BATCH_SIZE):
+                    BindingSurveyRepresentedVariable.objects.filter(
+                        variable__in=changed[start : start + BATCH_SIZE]
+                    ).update(is_indexed=False)
+                invalidate_export_snapshots_on_commit()
+                transaction.on_commit(BindingSurveyDocument().update_index)
+
+        action = "à modifier" if options["dry_run"] else "modifiés"
+        elapsed = time.time() - start_time
+        self.stdout.write(
+            f"{len(changed)} texte(s) {action} sur {len(variables)} en {elapsed:.2f} s"
+        )
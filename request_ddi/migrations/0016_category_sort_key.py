@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:39
+
+from django.db import migrations, models
+
+from request_ddi.utils.sort import category_sort_key
+
+
+def initialize_sort_key(apps, schema_editor):
+    category_model = apps.get_model("request_ddi", "Category")
+    categories = list(category_model.objects.only("id", "code"))
+    for category in categories:
+        category.sort_key = category_sort_key(category.code)
+    category_model.objects.bulk_update(categories, ["sort_key"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("request_ddi", "0015_category_missing"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="category",
+            name="sort_key",
+            field=models.CharField(default="", editable=False, max_length=520),
+        ),
+        migrations.AlterModelOptions(
+            name="category",
+            options={"ordering": ["sort_key"]},
+        ),
+        migrations.RunPython(initialize_sort_key, migrations.RunPython.noop),
+    ]
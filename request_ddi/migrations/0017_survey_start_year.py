@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:05
+
+from django.db import migrations, models
+
+
+def initialize_start_year(apps, schema_editor):
+    survey_model = apps.get_model("request_ddi", "Survey")
+    surveys = list(survey_model.objects.filter(start_date__isnull=False).only("id", "start_date"))
+    for survey in surveys:
+        survey.start_year = survey.start_date.year
+    survey_model.objects.bulk_update(surveys, ["start_year"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("request_ddi", "0016_category_sort_key"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="survey",
+            name="start_year",
+            field=models.PositiveSmallIntegerField(
+                blank=True, db_index=True, editable=False, null=True
+            ),
+        ),
+        migrations.RunPython(initialize_start_year, migrations.RunPython.noop),
+    ]
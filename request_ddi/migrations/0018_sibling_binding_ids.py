@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("request_ddi", "0017_survey_start_year"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="conceptualvariable",
+            name="sibling_binding_ids",
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="representedvariable",
+            name="sibling_binding_ids",
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:40
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("request_ddi", "0018_sibling_binding_ids"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="bindingsurveyrepresentedvariable",
+            index=models.Index(fields=["variable_name"], name="request_ddi_binding_varname"),
+        ),
+        migrations.AddIndex(
+            model_name="bindingsurveyrepresentedvariable",
+            index=models.Index(
+                condition=models.Q(("is_indexed", False)),
+                fields=["id"],
+                name="request_ddi_binding_unindexed",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="category",
+            index=models.Index(
+                models.F("code"),
+                django.db.models.functions.text.MD5("category_label"),
+                name="request_ddi_category_md5_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("request_ddi", "0019_hot_path_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="bindingsurveyrepresentedvariable",
+            name="content_hash",
+            field=models.CharField(blank=True, default="", editable=False, max_length=64),
+        ),
+    ]
@@ -25,6 +25,7 @@ function initializeDataTable() {
                 d.sub_collections = getFilterValues('subcollection-checkbox');
                 d.search_location = getSearchLocation();
                 d.years = getYearsFilter();
+                d.format = 'compact';
             },
             "headers": {'X-CSRFToken': $("input[name=csrfmiddlewaretoken]").val()},
             "dataSrc": function (json) {
@@ -57,10 +58,10 @@ function initializeDataTable() {
                     getYearsFilter().forEach(val => searchParams.append('years', val));
                     getSearchLocation().forEach(val => searchParams.append('search_location', val));
                     const url = '/question/' + row.id + '/?' + searchParams.toString();
-                    var categoriesDisplay = row.categories;
+                    var categoriesDisplay = renderCategories(row.categories);
                     var survey_doi = row.survey_doi;
                     var doiUrl = 'https://doi.org/' + survey_doi;
-                    var hasHighlightedModalities = row.is_category_search && row.categories && row.categories.includes('<mark style=');
+                    var hasHighlightedModalities = row.is_category_search && row.categories && row.categories.some(cat => cat[2]);
                     var caretIcon = hasHighlightedModalities ?
                         '<span class="background-red-caret"><img src="/static/svg/buttons/caret_down.svg" alt="Caret Down" class="icon-caret"></span>' :
                         '<img src="/static/svg/buttons/caret_down.svg" alt="Caret Down" class="icon-caret">'
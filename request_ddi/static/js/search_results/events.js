@@ -102,11 +102,33 @@ function attachStaticEventListeners() {
             sub_collections: Array.from(filterState.sub_collections),
             search_location: Array.from(filterState.search_location),
             years: Array.from(filterState.years),
+            stream: 1,
         };
         const searchParams = new URLSearchParams(params).toString();
         window.location.href = `/export/questions/?${searchParams}`;
     });
 
+    // Export de la recherche courante (mêmes paramètres que la DataTable, lus dans Elasticsearch)
+    $('#export-search').off('click').on('click', function () {
+        const params = {
+            'q': [$("input[name='q']").val()],
+            'survey[]': Array.from(filterState.survey),
+            'collections[]': Array.from(filterState.collections),
+            'sub_collections[]': Array.from(filterState.sub_collections),
+            'search_location[]': Array.from(filterState.search_location),
+            'years[]': Array.from(filterState.years),
+            'csrfmiddlewaretoken': [$("input[name=csrfmiddlewaretoken]").val()],
+        };
+        const form = $('<form>', {
+            method: 'POST',
+            action: `/api/${window.requestdata.api_version}/export-search-results/`,
+        });
+        Object.entries(params).forEach(([name, values]) => {
+            values.forEach(value => form.append($('<input>', {type: 'hidden', name, value})));
+        });
+        form.appendTo('body').trigger('submit').remove();
+    });
+
     // Export selected
     $('#export-selected').off('click').on('click', function () {
         if (selectedIds.size === 0) {
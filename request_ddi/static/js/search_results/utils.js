@@ -30,6 +30,17 @@ function toggleCategories(button, categoryId) {
 }
 
 
+// Construit le tableau des modalités à partir du format compact [code, libellé, correspondance]
+function renderCategories(categories) {
+    const style = "style='background-color: rgba(255, 70, 78, 0.15);'";
+    const rows = (categories || []).map(([code, label, matched]) => matched
+        ? `<tr><td class='code-cell'><mark ${style}>${code}</mark></td><td class='text-cell'><mark ${style}>${label}</mark></td></tr>`
+        : `<tr><td class='code-cell'>${code}</td><td class='text-cell'>${label}</td></tr>`
+    );
+    return `<table class='styled-table'>${rows.join('')}</table>`;
+}
+
+
 function updateTableContainerHeight() {
     const selectedFiltersContainer = $('#selected-filters-container');
     if (selectedFiltersContainer.is(':visible') && selectedFiltersContainer.children().length > 0) {
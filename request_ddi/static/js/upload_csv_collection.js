@@ -22,7 +22,7 @@ document.addEventListener("DOMContentLoaded", function() {
                 Swal.fire({
                     icon: 'success',
                     title: 'Succès',
-                    text: data.message,
+                    html: formatUpdatedSurveys(data),
                 }).then(() => {
                     $('#csvUploadModal').modal('hide');
                     location.reload();
@@ -45,4 +45,21 @@ document.addEventListener("DOMContentLoaded", function() {
             });
         });
     });
-});
\ No newline at end of file
+});
+
+// Message de succès suivi, en mode mise à jour, du détail des modifications par ligne
+function formatUpdatedSurveys(data) {
+    const escape = value => $('<div>').text(value ?? '').html();
+    let html = escape(data.message);
+    if (data.updated && data.updated.length) {
+        html += '<ul style="text-align: left; max-height: 300px; overflow-y: auto;">';
+        data.updated.forEach(diff => {
+            const changes = Object.entries(diff.changes)
+                .map(([field, change]) => `${escape(field)} : ${escape(change.old)} → ${escape(change.new)}`)
+                .join(', ');
+            html += `<li>Ligne ${diff.line} (${escape(diff.doi)}) : ${changes}</li>`;
+        });
+        html += '</ul>';
+    }
+    return html;
+}
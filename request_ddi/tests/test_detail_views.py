@@ -1,10 +1,13 @@
 import unittest
+from unittest.mock import patch
 
 from django.test import Client, TestCase
 from django.urls import reverse
 
+from request_ddi.core.documents import BindingSurveyDocument
 from request_ddi.core.models import (
     BindingSurveyRepresentedVariable,
+    BindingVariableCategoryStat,
     Category,
     ConceptualVariable,
     RepresentedVariable,
@@ -87,3 +90,94 @@ class QuestionDetailViewTest(TestCase):
 
         # Check that the question ID is correctly included in the template
         self.assertIn(str(self.question.id), content)
+
+
+class QuestionDetailQueryCountTest(TestCase):
+    """Le nombre de requêtes de la page de détail ne dépend pas du nombre de vagues."""
+
+    def create_waves(self, count):
+        conceptual_var = ConceptualVariable.objects.create(internal_label="AGE_CONCEPT")
+        variable = RepresentedVariable.objects.create(
+            conceptual_var=conceptual_var,
+            question_text="Quel âge avez-vous ?",
+            internal_label="AGE",
+        )
+        other_variable = RepresentedVariable.objects.create(
+            conceptual_var=conceptual_var, question_text="Votre âge ?", internal_label="AGE_BIS"
+        )
+        categories = [
+            Category.objects.create(code=code, category_label=f"Modalité {code}")
+            for code in ("1", "2", "10")
+        ]
+        variable.categories.add(*categories)
+        other_variable.categories.add(categories[0])
+
+        bindings = []
+        with patch.object(BindingSurveyDocument, "update"):
+            for wave in range(count):
+                survey = Survey.objects.create(name=f"Vague {wave}", external_ref=f"doi:{wave}")
+                bindings.append(
+                    BindingSurveyRepresentedVariable.objects.create(
+                        variable=variable, survey=survey, variable_name="AGE"
+                    )
+                )
+                BindingSurveyRepresentedVariable.objects.create(
+                    variable=other_variable, survey=survey, variable_name="AGE_BIS"
+                )
+        for category, stat in zip(categories, (30, 70, 0)):
+            BindingVariableCategoryStat.objects.create(
+                binding=bindings[0], category=category, stat=stat
+            )
+        return bindings[0]
+
+    def test_many_waves_fixed_query_count(self):
+        question = self.create_waves(30)
+        url = reverse("request_ddi:question_detail", args=[question.id])
+
+        # Premier affichage : les caches de bindings frères (variable, concept) sont calculés
+        with self.assertNumQueries(9):
+            self.client.get(url)
+
+        # binding + enquête + variables, catégories, statistiques, questions de la page, catégories
+        with self.assertNumQueries(5):
+            response = self.client.get(url)
+
+        context = response.context
+        self.assertEqual(len(context["similar_representative_questions"]), 29)
+        self.assertEqual(len(context["similar_conceptual_questions"]), 30)
+        self.assertEqual(
+            [cat.code for cat in context["similar_conceptual_questions"][0].categories], ["1"]
+        )
+        self.assertEqual(context["categories_percentages"], [30, 70, 0])
+
+    def test_categories_percentages(self):
+        question = self.create_waves(1)
+        missing = Category.objects.create(code="99", category_label="Refus", missing=True)
+        no_stat = Category.objects.create(code="5", category_label="Sans effectif")
+        question.variable.categories.add(missing, no_stat)
+        BindingVariableCategoryStat.objects.create(binding=question, category=missing, stat=20)
+
+        response = self.client.get(reverse("request_ddi:question_detail", args=[question.id]))
+
+        # Ordre : 1, 2, 5, 10, 99 ; la modalité manquante est rapportée aux non manquantes
+        self.assertEqual(response.context["categories_percentages"], [30, 70, 0, 0, 20])
+
+    def test_similar_questions_paginated(self):
+        question = self.create_waves(30)
+        RepresentedVariable.refresh_sibling_binding_ids([question.variable_id])
+        url = reverse("request_ddi:question_detail", args=[question.id])
+
+        with patch("request_ddi.views.detail_views.SIMILAR_PAGE_SIZE", 10):
+            response = self.client.get(url, {"concept_page": 3})
+
+        context = response.context
+        self.assertEqual(context["similar_conceptual_page"].paginator.count, 30)
+        self.assertEqual(len(context["similar_conceptual_questions"]), 10)
+        self.assertEqual(context["similar_conceptual_questions"][0].survey.name, "Vague 20")
+        self.assertEqual(context["similar_representative_page"].number, 1)
+        # Les autres paramètres (page de l'autre liste, recherche) sont conservés
+        self.assertEqual(
+            context["similar_representative_urls"], {"next": "?concept_page=3&similar_page=2"}
+        )
+        self.assertEqual(context["similar_conceptual_urls"], {"previous": "?concept_page=2"})
+        self.assertContains(response, "?concept_page=3&amp;similar_page=2#headingIdentiques")
@@ -1,18 +1,33 @@
 import csv
+import importlib.util
+import tempfile
 import unittest
 from datetime import date
-from io import StringIO
+from io import BytesIO, StringIO
+from unittest.mock import patch
 
-from django.test import Client, TestCase
+from django.core.management import CommandError, call_command
+from django.db import transaction
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from django_elasticsearch_dsl.search import Search
+from elasticsearch.dsl.utils import AttrDict
 
+from request_ddi.core.documents import BindingSurveyDocument
+from request_ddi.core.export_snapshots import (
+    invalidate_export_snapshots,
+    invalidate_export_snapshots_on_commit,
+    write_manifest,
+)
 from request_ddi.core.models import (
     BindingSurveyRepresentedVariable,
     Category,
+    Collection,
     ConceptualVariable,
     RepresentedVariable,
     Survey,
 )
+from request_ddi.management.commands.generate_export_snapshots import MAX_ATTEMPTS, Command
 
 from . import is_elasticsearch_available
 
@@ -119,3 +134,316 @@ class ExportQuestionsCSVViewTest(TestCase):
 
         # Header + 2 lignes si variables distinctes, sinon 1 ligne par variable
         self.assertEqual(len(rows), 3)  # header + 2 variables
+
+
+class ExportQuestionsCSVWithoutESTest(TestCase):
+    """Tests de l'export CSV ne nécessitant pas Elasticsearch (streaming, requêtes SQL)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        conceptual_var = ConceptualVariable.objects.create(internal_label="AGE_CONCEPT")
+        survey_a = Survey.objects.create(name="Survey A", external_ref="doi:a")
+        survey_b = Survey.objects.create(name="Survey B", external_ref="doi:b")
+        variable_1 = RepresentedVariable.objects.create(
+            conceptual_var=conceptual_var,
+            question_text="Quel âge avez-vous ?",
+            internal_label="AGE",
+        )
+        variable_2 = RepresentedVariable.objects.create(
+            conceptual_var=conceptual_var, question_text="Où habitez-vous ?", internal_label="LIEU"
+        )
+        variable_1.categories.add(Category.objects.create(code="1", category_label="Moins de 25"))
+
+        # Indexation Elasticsearch désactivée : seuls les bindings en base sont exportés
+        with patch.object(BindingSurveyDocument, "update"):
+            for survey in (survey_a, survey_b):
+                BindingSurveyRepresentedVariable.objects.create(
+                    variable=variable_1, survey=survey, variable_name="Q1"
+                )
+            BindingSurveyRepresentedVariable.objects.create(
+                variable=variable_2, survey=survey_a, variable_name="Q2"
+            )
+
+    def read_csv(self, response):
+        return list(csv.reader(StringIO(response.getvalue().decode("utf-8"))))
+
+    def test_stream_matches_buffered_export(self):
+        url = reverse("export_questions_csv")
+        streamed = self.client.get(url, {"stream": "1"})
+
+        self.assertTrue(streamed.streaming)
+        self.assertEqual(
+            streamed["Content-Disposition"], 'attachment; filename="questions_export.csv"'
+        )
+        streamed_rows = self.read_csv(streamed)
+        self.assertEqual(
+            streamed_rows[0],
+            ["question_text", "categories", "variable_label", "dataset_var1", "dataset_var2"],
+        )
+        self.assertEqual(sorted(streamed_rows[1:]), sorted(self.read_csv(self.client.get(url))[1:]))
+
+    def test_stream_header_width_for_filtered_export(self):
+        response = self.client.get(
+            reverse("export_questions_csv"),
+            {"stream": "1", "survey": [Survey.objects.get(external_ref="doi:a").id]},
+        )
+
+        rows = self.read_csv(response)
+        # 2 bindings pour AGE (toutes enquêtes confondues) → 2 colonnes dataset_var
+        self.assertEqual(len(rows[0]), 5)
+        self.assertEqual(len(rows), 3)
+
+    def test_export_query_count_does_not_grow(self):
+        conceptual_var = ConceptualVariable.objects.get(internal_label="AGE_CONCEPT")
+        surveys = [
+            Survey.objects.create(name=f"Vague {i}", external_ref=f"doi:vague-{i}")
+            for i in range(5)
+        ]
+        with patch.object(BindingSurveyDocument, "update"):
+            for i in range(5):
+                variable = RepresentedVariable.objects.create(
+                    conceptual_var=conceptual_var,
+                    question_text=f"Question {i}",
+                    internal_label=f"V{i}",
+                )
+                variable.categories.add(
+                    Category.objects.create(code=str(i), category_label=f"Modalité {i}")
+                )
+                for survey in surveys:
+                    BindingSurveyRepresentedVariable.objects.create(
+                        variable=variable, survey=survey, variable_name=f"V{i}"
+                    )
+
+        url = reverse("export_questions_csv")
+        # bindings + variables, catégories, bindings frères + enquêtes
+        with self.assertNumQueries(3):
+            rows = self.read_csv(self.client.get(url))
+        self.assertEqual(len(rows), 1 + 3 + 25)
+        question_4 = next(row for row in rows if row[0] == "Question 4")
+        self.assertIn("urn:ddi.cdsp:doi:vague-4:V4", question_4)
+
+        # + l'agrégat donnant la largeur de l'en-tête
+        with self.assertNumQueries(4):
+            self.read_csv(self.client.get(url, {"stream": "1"}))
+
+    def test_group_by_variable_emits_each_variable_once(self):
+        bindings = BindingSurveyRepresentedVariable.objects.filter(variable_name="Q1")
+        params = {"ids": [binding.id for binding in bindings]}
+        url = reverse("export_questions_csv")
+
+        self.assertEqual(len(self.read_csv(self.client.get(url, params))), 3)
+
+        with self.assertNumQueries(3):
+            rows = self.read_csv(self.client.get(url, {**params, "group_by": "variable"}))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][:3], ["Quel âge avez-vous ?", "1,Moins de 25", "AGE"])
+        self.assertEqual(sorted(rows[1][3:]), ["urn:ddi.cdsp:doi:a:Q1", "urn:ddi.cdsp:doi:b:Q1"])
+
+        streamed = self.read_csv(
+            self.client.get(url, {**params, "group_by": "variable", "stream": "1"})
+        )
+        self.assertEqual(streamed, rows)
+
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow is required for this test")
+    def test_columnar_long_format(self):
+        import pyarrow as pa  # noqa: PLC0415
+        import pyarrow.parquet as pq  # noqa: PLC0415
+
+        url = reverse("export_questions_csv")
+        params = {"group_by": "variable"}
+
+        response = self.client.get(url, {**params, "format": "parquet"})
+        self.assertEqual(response["Content-Type"], "application/vnd.apache.parquet")
+        table = pq.read_table(BytesIO(response.getvalue()))
+
+        self.assertEqual(
+            table.column_names, ["question_text", "categories", "variable_label", "dataset_var"]
+        )
+        # Une ligne par variable de jeu de données : AGE (Q1 x 2) + LIEU (Q2)
+        rows = sorted(table.to_pylist(), key=lambda row: row["dataset_var"])
+        self.assertEqual(
+            [row["dataset_var"] for row in rows],
+            ["urn:ddi.cdsp:doi:a:Q1", "urn:ddi.cdsp:doi:a:Q2", "urn:ddi.cdsp:doi:b:Q1"],
+        )
+        self.assertEqual(rows[0]["categories"], [{"code": "1", "label": "Moins de 25"}])
+
+        response = self.client.get(url, {**params, "format": "arrow"})
+        arrow_table = pa.ipc.open_file(BytesIO(response.getvalue())).read_all()
+        self.assertEqual(arrow_table.num_rows, 3)
+
+    def test_unknown_format(self):
+        response = self.client.get(reverse("export_questions_csv"), {"format": "xlsx"})
+        self.assertEqual(response.status_code, 400)
+
+
+class ExportSearchResultsCSVViewTest(TestCase):
+    """Tests de l'export CSV de la recherche courante depuis Elasticsearch."""
+
+    url = reverse("request_ddi_api:export_search_results")
+
+    @patch.object(Search, "iterate", autospec=True)
+    def test_export_streams_all_hits(self, mock_iterate):
+        mock_iterate.return_value = iter(
+            [
+                AttrDict(
+                    {
+                        "variable_name": f"Q{i}",
+                        "survey": {"external_ref": "doi:ess"},
+                        "variable": {
+                            "question_text": "Quel âge avez-vous ?",
+                            "internal_label": "AGE",
+                            "categories": [{"code": "1", "category_label": "Moins de 25"}],
+                        },
+                    }
+                )
+                for i in range(3)
+            ]
+        )
+
+        response = self.client.post(
+            self.url, {"q": "âge", "search_location[]": ["questions"], "years[]": ["2020"]}
+        )
+
+        self.assertTrue(response.streaming)
+        rows = list(csv.reader(StringIO(response.getvalue().decode("utf-8"))))
+        self.assertEqual(rows[0], ["question_text", "categories", "variable_label", "dataset_var"])
+        self.assertEqual(
+            rows[1], ["Quel âge avez-vous ?", "1,Moins de 25", "AGE", "urn:ddi.cdsp:doi:ess:Q0"]
+        )
+        self.assertEqual(len(rows), 4)
+
+        (search,) = mock_iterate.call_args[0]
+        body = search.to_dict()
+        self.assertNotIn("highlight", body)
+        self.assertIn("variable.question_text", body["_source"])
+        self.assertEqual(
+            body["query"]["bool"]["filter"], [{"terms": {"survey.start_year": [2020]}}]
+        )
+
+    @patch.object(Search, "iterate", autospec=True)
+    def test_export_error_before_streaming(self, mock_iterate):
+        mock_iterate.side_effect = Exception("Elasticsearch indisponible")
+
+        response = self.client.post(self.url, {"q": "âge"})
+
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.json(), {"error": "Elasticsearch indisponible"})
+
+
+class ExportSnapshotsTest(TestCase):
+    """Tests des exports pré-générés et du GET conditionnel."""
+
+    @classmethod
+    @patch("request_ddi.core.signals.invalidate_export_snapshots_on_commit")
+    def setUpTestData(cls, mock_invalidate):
+        # Données supposées validées avant la génération : pas d'invalidation en attente
+        cls.collection = Collection.objects.create(name="Collection ESS")
+        survey = Survey.objects.create(name="ESS 1", external_ref="doi:ess1")
+        variable = RepresentedVariable.objects.create(
+            conceptual_var=ConceptualVariable.objects.create(internal_label="AGE_CONCEPT"),
+            question_text="Quel âge avez-vous ?",
+            internal_label="AGE",
+        )
+        with patch.object(BindingSurveyDocument, "update"):
+            BindingSurveyRepresentedVariable.objects.create(
+                variable=variable, survey=survey, variable_name="Q1"
+            )
+
+    def setUp(self):
+        snapshots_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(snapshots_dir.cleanup)
+        settings_override = override_settings(EXPORT_SNAPSHOTS_DIR=snapshots_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        call_command("generate_export_snapshots", stdout=StringIO())
+        self.url = reverse("export_questions_csv")
+
+    def test_snapshot_served_with_conditional_get(self):
+        # group_by n'est pas pré-généré : l'export est calculé (une seule variable ici)
+        live = self.client.get(self.url, {"format": "csv", "group_by": "variable"})
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, {"stream": "1"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("ETag", response)
+        self.assertIn("Last-Modified", response)
+        self.assertEqual(b"".join(response.streaming_content), live.content)
+
+        not_modified = self.client.get(self.url, headers={"if-none-match": response["ETag"]})
+        self.assertEqual(not_modified.status_code, 304)
+
+        per_collection = self.client.get(self.url, {"collections": [self.collection.id]})
+        self.assertNotEqual(per_collection["ETag"], response["ETag"])
+
+    def test_filtered_export_is_computed(self):
+        response = self.client.get(self.url, {"years": "2020"})
+        self.assertNotIn("ETag", response)
+
+    def test_snapshot_invalidated_on_change(self):
+        with (
+            patch(
+                "request_ddi.core.export_snapshots.invalidate_export_snapshots",
+                wraps=invalidate_export_snapshots,
+            ) as mock_invalidate,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            Survey.objects.create(name="ESS 2", external_ref="doi:ess2")
+            Survey.objects.create(name="ESS 3", external_ref="doi:ess3")
+        # Une seule invalidation par transaction
+        mock_invalidate.assert_called_once()
+
+        response = self.client.get(self.url)
+        self.assertNotIn("ETag", response)
+        self.assertIn("Quel âge avez-vous ?", response.content.decode("utf-8"))
+
+    def test_invalidation_registered_again_after_rollback(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with transaction.atomic():
+                invalidate_export_snapshots_on_commit()
+                transaction.set_rollback(True)
+            invalidate_export_snapshots_on_commit()
+            invalidate_export_snapshots_on_commit()
+        self.assertEqual(len(callbacks), 1)
+
+    def test_manifest_written_before_invalidation_not_served(self):
+        # Invalidation validée entre la génération et l'écriture du manifeste
+        with patch(
+            "request_ddi.management.commands.generate_export_snapshots.write_manifest",
+            side_effect=lambda files, version: (
+                invalidate_export_snapshots(),
+                write_manifest(files, version),
+            ),
+        ):
+            call_command("generate_export_snapshots", stdout=StringIO())
+        self.assertNotIn("ETag", self.client.get(self.url))
+
+    def test_snapshot_invalidated_on_collection_change(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.collection.name = "ESS"
+            self.collection.save()
+
+        response = self.client.get(self.url, {"collections": [self.collection.id]})
+        self.assertNotIn("ETag", response)
+
+    def test_snapshot_not_published_if_data_changed_during_generation(self):
+        generate = Command.generate
+
+        def generate_with_concurrent_write(command, no_collections):
+            files = generate(command, no_collections)
+            if not changes:
+                changes.append(Survey.objects.create(name="ESS 2", external_ref="doi:ess2"))
+                invalidate_export_snapshots()  # commit de la modification concurrente
+            return files
+
+        changes = []
+        with patch.object(Command, "generate", generate_with_concurrent_write):
+            call_command("generate_export_snapshots", stdout=StringIO())
+        # Seconde génération, publiée : elle inclut la nouvelle enquête
+        self.assertIn("ETag", self.client.get(self.url))
+
+        with patch.object(Command, "generate", autospec=True) as mock_generate:
+            mock_generate.side_effect = lambda *args: invalidate_export_snapshots() or {}
+            with self.assertRaises(CommandError):
+                call_command("generate_export_snapshots", stdout=StringIO())
+        self.assertEqual(mock_generate.call_count, MAX_ATTEMPTS)
+        self.assertNotIn("ETag", self.client.get(self.url))
@@ -1,6 +1,13 @@
+import threading
+import time
+from unittest.mock import patch
+
+from django.core.cache import cache
 from django.test import Client, TestCase
 from django.urls import reverse
 
+from request_ddi.core import hierarchy
+from request_ddi.core.hierarchy import invalidate_hierarchy
 from request_ddi.core.models import Collection, Subcollection, Survey
 
 
@@ -18,6 +25,10 @@ class JSONViewsTest(TestCase):
             name="Survey Test", subcollection=cls.subcollection, start_date="2020-01-01"
         )
 
+    def setUp(self):
+        # Le rollback des tests ne déclenche pas les signaux d'invalidation
+        invalidate_hierarchy()
+
     # The test `test_get_surveys_by_collections` has been removed
     # because the `get_surveys_by_collections` endpoint no longer exists.
 
@@ -65,3 +76,47 @@ class JSONViewsTest(TestCase):
         data = response.json()
         self.assertIn("years", data)
         self.assertEqual(data["years"], [2020])
+
+    def test_filters_served_from_hierarchy_cache(self):
+        """Teste que les filtres sont servis sans SQL une fois l'arborescence en cache."""
+        url = reverse("request_ddi_api:get_surveys_by_subcollections")
+        params = {"subcollections_ids": str(self.subcollection.id)}
+        self.client.get(url, params)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, params)
+        self.assertEqual(len(response.json()["surveys"]), 1)
+
+        Survey.objects.create(
+            name="Survey 10",
+            subcollection=self.subcollection,
+            external_ref="doi:1234/10",
+        )
+        Survey.objects.create(
+            name="Survey 9",
+            subcollection=self.subcollection,
+            external_ref="doi:1234/9",
+        )
+        response = self.client.get(url, params)
+        names = [survey["name"] for survey in response.json()["surveys"]]
+        self.assertEqual(names, ["Survey 9", "Survey 10", "Survey Test"])
+
+    def test_hierarchy_rebuilt_once_by_waiting_threads(self):
+        """Teste qu'un thread en attente du verrou réutilise l'arborescence reconstruite."""
+        built = hierarchy.get_hierarchy()
+        invalidate_hierarchy()
+        results = []
+
+        with patch.object(hierarchy.HierarchySnapshot, "build") as mock_build:
+            with hierarchy._lock:
+                waiting = threading.Thread(target=lambda: results.append(hierarchy.get_hierarchy()))
+                waiting.start()
+                waiting.join(timeout=0.2)
+                # Reconstruction par le thread qui détenait le verrou
+                hierarchy._snapshot = built
+                hierarchy._snapshot_version = cache.get(hierarchy.HIERARCHY_VERSION_KEY)
+                hierarchy._snapshot_built_at = time.monotonic()
+            waiting.join()
+
+        mock_build.assert_not_called()
+        self.assertEqual(results, [built])
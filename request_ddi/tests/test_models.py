@@ -1,8 +1,11 @@
 import unittest
+from unittest.mock import patch
 
-from django.db import IntegrityError
+from django.db import IntegrityError, connection
+from django.db.models.functions import MD5
 from django.test import TestCase
 
+from request_ddi.core.documents import BindingSurveyDocument
 from request_ddi.core.models import (
     BindingConcept,
     BindingSurveyRepresentedVariable,
@@ -15,6 +18,8 @@ from request_ddi.core.models import (
     Subcollection,
     Survey,
 )
+from request_ddi.core.signals import import_in_progress
+from request_ddi.views.upload_views import bulk_get_or_create
 
 from . import is_elasticsearch_available
 
@@ -84,6 +89,174 @@ class RepresentedVariableTests(TestCase):
         self.assertEqual(len(next(iter(grouped.values()))), 2)
 
 
+class CategoryOrderingTests(TestCase):
+    """Tests de la clé de tri des catégories calculée à l'enregistrement."""
+
+    def test_ordered_categories(self):
+        conceptual = ConceptualVariable.objects.create(internal_label="TestVar")
+        variable = RepresentedVariable.objects.create(
+            conceptual_var=conceptual,
+            question_text="Êtes-vous satisfait ?",
+            type_categories="code",
+        )
+        for code in ["10", "b", "2", "01", "1", "a"]:
+            variable.categories.add(Category.objects.create(code=code, category_label=code))
+
+        codes = [category.code for category in variable.ordered_categories]
+        self.assertEqual(codes, ["01", "1", "2", "10", "a", "b"])
+
+    def test_sort_key_filled_by_bulk_operations(self):
+        # Chemin groupé de l'import CSV : bulk_get_or_create passe par bulk_create
+        categories = bulk_get_or_create(
+            Category, ["code", "category_label"], {(code, code) for code in ["10", "b", "2"]}
+        )
+        self.assertEqual(list(Category.objects.values_list("code", flat=True)), ["2", "10", "b"])
+
+        category = categories[("b", "b")]
+        category.code = "1"
+        Category.objects.bulk_update([category], ["code"])
+        self.assertEqual(list(Category.objects.values_list("code", flat=True)), ["1", "2", "10"])
+
+
+class SurveyStartYearTests(TestCase):
+    def test_start_year_follows_start_date(self):
+        survey = Survey.objects.create(
+            name="ESS", external_ref="doi:start-year", start_date="2018-06-01"
+        )
+        self.assertEqual(survey.start_year, 2018)
+
+        survey.start_date = None
+        survey.save()
+        self.assertIsNone(Survey.objects.get(pk=survey.pk).start_year)
+
+
+class SiblingBindingIdsTests(TestCase):
+    def setUp(self):
+        patcher = patch.object(BindingSurveyDocument, "update")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.conceptual = ConceptualVariable.objects.create(internal_label="AGE")
+        self.variable = RepresentedVariable.objects.create(
+            conceptual_var=self.conceptual, question_text="Âge ?", internal_label="AGE"
+        )
+        other = RepresentedVariable.objects.create(
+            conceptual_var=self.conceptual, question_text="Votre âge ?", internal_label="AGE2"
+        )
+        survey = Survey.objects.create(name="ESS", external_ref="doi:siblings")
+        self.bindings = [
+            BindingSurveyRepresentedVariable.objects.create(
+                survey=survey, variable=variable, variable_name=name
+            )
+            for variable, name in ((self.variable, "Q1"), (self.variable, "Q2"), (other, "Q3"))
+        ]
+
+    def test_lazy_cache_and_invalidation(self):
+        ids = [binding.id for binding in self.bindings]
+        self.assertEqual(self.variable.get_sibling_binding_ids(), ids[:2])
+        self.assertEqual(self.conceptual.get_sibling_binding_ids(), ids)
+        self.assertEqual(
+            RepresentedVariable.objects.get(pk=self.variable.pk).sibling_binding_ids, ids[:2]
+        )
+
+        self.bindings[0].delete()
+        self.assertIsNone(RepresentedVariable.objects.get(pk=self.variable.pk).sibling_binding_ids)
+        self.assertIsNone(ConceptualVariable.objects.get(pk=self.conceptual.pk).sibling_binding_ids)
+
+    def test_variable_change_invalidates_both_variables(self):
+        other_conceptual = ConceptualVariable.objects.create(internal_label="SEXE")
+        new_variable = RepresentedVariable.objects.create(
+            conceptual_var=other_conceptual, question_text="Sexe ?", internal_label="SEXE"
+        )
+        for instance in (self.variable, self.conceptual, new_variable, other_conceptual):
+            instance.get_sibling_binding_ids()
+
+        # Binding rechargé, modifié hors import (admin, shell...)
+        binding = BindingSurveyRepresentedVariable.objects.get(pk=self.bindings[0].pk)
+        binding.notes = "Note"
+        binding.save()
+        self.assertIsNotNone(
+            RepresentedVariable.objects.get(pk=self.variable.pk).sibling_binding_ids
+        )
+
+        binding.variable = new_variable
+        binding.save()
+        for model, pk in (
+            (RepresentedVariable, self.variable.pk),
+            (ConceptualVariable, self.conceptual.pk),
+            (RepresentedVariable, new_variable.pk),
+            (ConceptualVariable, other_conceptual.pk),
+        ):
+            self.assertIsNone(model.objects.get(pk=pk).sibling_binding_ids)
+        self.assertEqual(
+            RepresentedVariable.objects.get(pk=new_variable.pk).get_sibling_binding_ids(),
+            [binding.id],
+        )
+
+    def test_no_invalidation_during_import(self):
+        self.variable.get_sibling_binding_ids()
+        with import_in_progress(), self.assertNumQueries(1):
+            BindingSurveyRepresentedVariable.objects.create(
+                survey=self.bindings[0].survey, variable=self.variable, variable_name="Q4"
+            )
+        self.assertIsNotNone(
+            RepresentedVariable.objects.get(pk=self.variable.pk).sibling_binding_ids
+        )
+
+    def test_refresh_in_bulk(self):
+        RepresentedVariable.refresh_sibling_binding_ids([self.variable.id])
+
+        ids = [binding.id for binding in self.bindings]
+        self.assertEqual(
+            RepresentedVariable.objects.get(pk=self.variable.pk).sibling_binding_ids, ids[:2]
+        )
+        self.assertEqual(
+            ConceptualVariable.objects.get(pk=self.conceptual.pk).sibling_binding_ids, ids
+        )
+
+
+class IndexUsageTests(TestCase):
+    """Vérifie via EXPLAIN que les chemins fréquents utilisent les index dédiés."""
+
+    def setUp(self):
+        if connection.vendor == "postgresql":
+            # Sur des tables quasi vides, PostgreSQL préfère sinon un parcours séquentiel
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def assert_uses_index(self, queryset, index_name):
+        self.assertIn(index_name, queryset.explain())
+
+    def test_variable_name_index(self):
+        self.assert_uses_index(
+            BindingSurveyRepresentedVariable.objects.filter(variable_name="Q1"),
+            "request_ddi_binding_varname",
+        )
+
+    def test_not_indexed_partial_index(self):
+        self.assert_uses_index(
+            BindingSurveyRepresentedVariable.objects.filter(is_indexed=False),
+            "request_ddi_binding_unindexed",
+        )
+
+    def test_category_md5_index(self):
+        category, created = Category.get_or_create_by_label("1", "Oui")
+        self.assertTrue(created)
+        self.assertEqual(Category.get_or_create_by_label("1", "Oui"), (category, False))
+
+        queryset = Category.objects.alias(label_md5=MD5("category_label")).filter(
+            code="1", label_md5="0" * 32
+        )
+        self.assert_uses_index(queryset, "request_ddi_category_md5_idx")
+
+    def test_category_without_label(self):
+        category, created = Category.get_or_create_by_label("9", None)
+        self.assertTrue(created)
+        self.assertIsNone(category.category_label)
+        self.assertEqual(Category.get_or_create_by_label("9", None), (category, False))
+        self.assertTrue(Category.get_or_create_by_label("9", "")[1])
+
+
 class ModelConstraintTests(TestCase):
     def test_category_unique_constraint(self):
         Category.objects.create(code="1", category_label="Homme")
@@ -0,0 +1,181 @@
+import os
+import re
+import unicodedata
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from request_ddi.core.documents import BindingSurveyDocument
+from request_ddi.core.models import (
+    BindingSurveyRepresentedVariable,
+    ConceptualVariable,
+    RepresentedVariable,
+    Survey,
+)
+from request_ddi.management.commands.benchmark_normalization import codebook_strings
+from request_ddi.utils.codebooks import TEST_FILES_DIR
+from request_ddi.utils.normalize_string import (
+    clear_normalize_cache,
+    normalize_many,
+    normalize_string_for_comparison,
+    normalize_string_for_database,
+)
+
+
+def reference_for_database(value):
+    """Implémentation d'origine, passe par passe, servant de référence."""
+    if not isinstance(value, str):
+        return value
+    text = unicodedata.normalize("NFKC", value)
+    text = re.sub(r"[\u00A0\u202F\u2007\u2060\u2027\u00B7]", " ", text)
+    text = text.replace("«", '"').replace("»", '"')
+    text = text.replace("“", '"').replace("”", '"')
+    text = re.sub(r"(?<!\s)([?;])", r" \1", text)
+    text = re.sub(r'(?<!\s)(["])', r" \1", text)
+    text = re.sub(r'(["])(?=\S)', r"\1 ", text)
+    text = text.replace("’", "'").replace("–", "-")  # noqa: RUF001
+    text = text.replace("…", "...")
+    text = re.sub(r"\.{3,}", "...", text)
+    return " ".join(text.split())
+
+
+def reference_for_comparison(value):
+    if not isinstance(value, str):
+        return value
+    text = unicodedata.normalize("NFD", value)
+    text = "".join(char for char in text if unicodedata.category(char) != "Mn")
+    return text.lower()
+
+
+class NormalizeStringTests(SimpleTestCase):
+    samples = [  # noqa: RUF012
+        "",
+        "Oui",
+        "  Quel   âge avez-vous?  ",
+        "Êtes-vous «satisfait»;ou pas?",
+        "Il a dit \u201cbonjour\u201d\u2026et après....",
+        "Prix\u00a0: 10\u202f€ \u2060fin\u00b7x\u2027y\u2007z",
+        "Aujourd\u2019hui \u2013 demain",
+        'Déjà"vu"?',
+        "\u0152uvre STRASSE Stra\u00dfe \u0386\u0388\u0389 \ufb01n \u2460",
+        "Greek question mark\u037e ideographic\u3000space",
+        "e\u0301te\u0301 cafe\u0301",
+    ]
+
+    def test_same_results_as_reference(self):
+        for value in self.samples:
+            with self.subTest(value=value):
+                self.assertEqual(
+                    normalize_string_for_database(value), reference_for_database(value)
+                )
+                self.assertEqual(
+                    normalize_string_for_comparison(value), reference_for_comparison(value)
+                )
+
+    def test_same_results_on_bundled_codebook(self):
+        path = os.path.join(TEST_FILES_DIR, "fr.cdsp.elipss.2019.03.ea-ddi25.xml")
+        for value in codebook_strings([path]):
+            database = normalize_string_for_database(value)
+            self.assertEqual(database, reference_for_database(value))
+            self.assertEqual(
+                normalize_string_for_comparison(database), reference_for_comparison(database)
+            )
+
+    def test_non_strings_are_returned_unchanged(self):
+        for value in (None, 12, ["Oui"]):
+            self.assertIs(normalize_string_for_database(value), value)
+            self.assertIs(normalize_string_for_comparison(value), value)
+
+    def test_cache_can_be_cleared(self):
+        normalize_string_for_database("Oui")
+        clear_normalize_cache()
+        self.assertEqual(normalize_string_for_database("Oui ?"), "Oui ?")
+
+    def test_benchmark_command(self):
+        path = os.path.join(TEST_FILES_DIR, "fr.cdsp.elipss.2019.03.ea-ddi25.xml")
+        out = StringIO()
+        call_command("benchmark_normalization", path, "--repeat", "1", stdout=out)
+        self.assertIn("chaînes extraites de 1 fichier(s)", out.getvalue())
+        self.assertIn("Avec cache", out.getvalue())
+
+
+def count_calls(value):
+    count_calls.calls += 1
+    return value.upper()
+
+
+class NormalizeManyTests(SimpleTestCase):
+    def setUp(self):
+        count_calls.calls = 0
+
+    def test_unique_values_are_normalized_once(self):
+        values = ["oui", "non", "oui", None, "oui", 3]
+        self.assertEqual(normalize_many(values, count_calls), ["OUI", "NON", "OUI", None, "OUI", 3])
+        self.assertEqual(count_calls.calls, 2)
+
+    def test_default_normalization(self):
+        values = ["Déjà vu?", "Oui", "Déjà vu?"]
+        self.assertEqual(normalize_many(values), [normalize_string_for_database(v) for v in values])
+        self.assertEqual(
+            normalize_many(values, normalize_string_for_comparison),
+            [normalize_string_for_comparison(v) for v in values],
+        )
+
+    def test_process_pool(self):
+        values = [f"Question {i % 50}?" for i in range(200)]
+        self.assertEqual(
+            normalize_many(values, processes=2),
+            [normalize_string_for_database(v) for v in values],
+        )
+
+
+class NormalizeQuestionTextsCommandTests(TestCase):
+    def setUp(self):
+        patcher = patch.object(BindingSurveyDocument, "update")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        conceptual = ConceptualVariable.objects.create(internal_label="AGE")
+        survey = Survey.objects.create(name="ESS", external_ref="doi:backfill")
+        self.stale = RepresentedVariable.objects.create(
+            conceptual_var=conceptual, question_text="Quel âge avez-vous?", internal_label="AGE"
+        )
+        self.clean = RepresentedVariable.objects.create(
+            conceptual_var=conceptual, question_text="Votre sexe ?", internal_label="SEXE"
+        )
+        for variable, name in ((self.stale, "Q1"), (self.clean, "Q2")):
+            BindingSurveyRepresentedVariable.objects.create(
+                survey=survey, variable=variable, variable_name=name, is_indexed=True
+            )
+
+    def run_command(self, *args):
+        out = StringIO()
+        patcher = patch.object(BindingSurveyDocument, "update_index")
+        with patcher as update_index, self.captureOnCommitCallbacks(execute=True):
+            call_command("normalize_question_texts", *args, stdout=out)
+        return out.getvalue(), update_index
+
+    def test_dry_run_writes_nothing(self):
+        out, update_index = self.run_command("--dry-run")
+        self.assertIn("1 texte(s) à modifier sur 2", out)
+        self.stale.refresh_from_db()
+        self.assertEqual(self.stale.question_text, "Quel âge avez-vous?")
+        update_index.assert_not_called()
+
+    def test_backfill_with_process_pool(self):
+        out, update_index = self.run_command("--processes", "2")
+        self.assertIn("1 texte(s) modifiés sur 2", out)
+        self.stale.refresh_from_db()
+        self.assertEqual(self.stale.question_text, "Quel âge avez-vous ?")
+        # Seul le binding de la variable modifiée est à réindexer
+        self.assertEqual(
+            list(
+                BindingSurveyRepresentedVariable.objects.filter(is_indexed=False).values_list(
+                    "variable_id", flat=True
+                )
+            ),
+            [self.stale.id],
+        )
+        update_index.assert_called_once()
@@ -2,10 +2,15 @@
 from unittest.mock import MagicMock, patch
 
 # -- DJANGO
-from django.test import Client, TestCase
+from django.test import Client, RequestFactory, TestCase
 from django.urls import reverse
+from django_elasticsearch_dsl.search import Search
+from elasticsearch.dsl.utils import AttrDict
 
+from request_ddi.core.documents import BindingSurveyDocument
+from request_ddi.core.hierarchy import invalidate_hierarchy
 from request_ddi.core.models import (
+    BindingSurveyRepresentedVariable,
     Collection,
     ConceptualVariable,
     RepresentedVariable,
@@ -141,7 +146,179 @@ class SearchResultsDataViewTest(BaseSearchViewTest):
         self.assertEqual(json_data["error"], "Erreur")
 
 
+class BuildFilteredSearchTest(TestCase):
+    def build_search(self, data):
+        view = SearchResultsDataView()
+        view.request = RequestFactory().post("/", data)
+        return view.build_filtered_search().to_dict()
+
+    def test_no_highlight_without_query(self):
+        body = self.build_search({"q": "", "search_location[]": ["questions"]})
+        self.assertNotIn("highlight", body)
+
+    def test_highlight_only_active_locations(self):
+        body = self.build_search({"q": "âge", "search_location[]": ["questions", "variable_name"]})
+        self.assertEqual(
+            set(body["highlight"]["fields"]), {"variable.question_text", "variable_name"}
+        )
+        self.assertEqual(body["highlight"]["type"], "unified")
+
+    def test_years_single_terms_filter(self):
+        body = self.build_search({"q": "", "years[]": ["2019", "2020"]})
+        self.assertEqual(
+            body["query"]["bool"]["filter"], [{"terms": {"survey.start_year": [2019, 2020]}}]
+        )
+
+
+class FormatSearchResultsTest(TestCase):
+    def setUp(self):
+        hit = AttrDict(
+            {
+                "variable_name": "Q1",
+                "notes": "",
+                "variable": {
+                    "question_text": "Avez-vous voté ?",
+                    "internal_label": "VOTE",
+                    "categories": [
+                        {"code": "1", "category_label": "Oui"},
+                        {"code": "2", "category_label": "Non"},
+                    ],
+                },
+                "survey": {"name": "Survey Test", "external_ref": "doi:1234/test"},
+                "meta": {
+                    "id": "1",
+                    "highlight": {"variable.categories.category_label": ["<mark>Non</mark>"]},
+                },
+            }
+        )
+        self.response = MagicMock(hits=[hit])
+
+    def test_compact_categories(self):
+        data = SearchResultsDataView().format_search_results(
+            self.response, ["categories"], compact=True
+        )
+        self.assertEqual(data[0]["categories"], [["1", "Oui", False], ["2", "Non", True]])
+
+    def test_html_categories(self):
+        data = SearchResultsDataView().format_search_results(self.response, ["categories"])
+        self.assertTrue(data[0]["categories"].startswith("<table class='styled-table'>"))
+        self.assertIn(
+            "<mark style='background-color: rgba(255, 70, 78, 0.15);'>Non</mark>",
+            data[0]["categories"],
+        )
+
+
+class SearchFacetsViewTest(BaseSearchViewTest):
+    def setUp(self):
+        self.url = reverse("request_ddi_api:facets")
+
+    @patch.object(Search, "execute", autospec=True)
+    def test_facets_for_current_query(self, mock_execute):
+        mock_execute.return_value = AttrDict(
+            {
+                "hits": {"total": {"value": 3}},
+                "aggregations": {
+                    "collections": {"buckets": [{"key": self.collection.id, "doc_count": 3}]},
+                    "subcollections": {"buckets": [{"key": self.subcollection.id, "doc_count": 3}]},
+                    "surveys": {"buckets": [{"key": self.survey.id, "doc_count": 3}]},
+                    "years": {
+                        "buckets": [
+                            {"key": 2019, "doc_count": 1},
+                            {"key": 2020, "doc_count": 2},
+                        ]
+                    },
+                },
+            }
+        )
+
+        response = self.client.post(self.url, {"q": "âge", "search_location[]": ["questions"]})
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["total"], 3)
+        self.assertEqual(data["surveys"], [{"id": self.survey.id, "count": 3}])
+        self.assertEqual(data["years"], [{"year": 2019, "count": 1}, {"year": 2020, "count": 2}])
+        self.assertEqual(data["decades"], {"2010": [2019], "2020": [2020]})
+
+        body = mock_execute.call_args[0][0].to_dict()
+        self.assertEqual(body["size"], 0)
+        self.assertEqual(set(body["aggs"]), {"collections", "subcollections", "surveys", "years"})
+        self.assertNotIn("highlight", body)
+
+
+class SuggestionsViewTest(BaseSearchViewTest):
+    def setUp(self):
+        self.url = reverse("request_ddi_api:suggest")
+
+    def test_empty_query_returns_no_suggestion(self):
+        with patch.object(Search, "execute") as mock_execute:
+            response = self.client.get(self.url, {"q": " "})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["suggestions"], [])
+        mock_execute.assert_not_called()
+
+    @patch.object(Search, "execute", autospec=True)
+    def test_suggestions_filtered_by_survey(self, mock_execute):
+        option = MagicMock(text="Quel âge avez-vous ?")
+        mock_execute.return_value.suggest.suggestions = [MagicMock(options=[option])]
+
+        response = self.client.get(
+            self.url, {"q": "quel", "survey[]": [str(self.survey.id)], "size": "5"}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["suggestions"], ["Quel âge avez-vous ?"])
+
+        body = mock_execute.call_args[0][0].to_dict()
+        completion = body["suggest"]["suggestions"]["completion"]
+        self.assertEqual(body["suggest"]["suggestions"]["prefix"], "quel")
+        self.assertEqual(completion["size"], 5)
+        self.assertEqual(completion["contexts"]["scope"], [f"survey:{self.survey.id}"])
+        self.assertNotIn("highlight", body)
+
+    @patch.object(Search, "execute", autospec=True)
+    def test_suggestions_filtered_by_years(self, mock_execute):
+        mock_execute.return_value.suggest.suggestions = []
+
+        self.client.get(
+            self.url,
+            {"q": "quel", "collections[]": [str(self.collection.id)], "years[]": ["2020", "2021"]},
+        )
+
+        body = mock_execute.call_args[0][0].to_dict()
+        self.assertEqual(
+            body["suggest"]["suggestions"]["completion"]["contexts"]["scope"],
+            [
+                f"collection:{self.collection.id}|year:2020",
+                f"collection:{self.collection.id}|year:2021",
+            ],
+        )
+
+    @patch.object(Search, "execute", autospec=True)
+    def test_size_is_clamped(self, mock_execute):
+        mock_execute.return_value.suggest.suggestions = []
+
+        for size, expected in (("0", 1), ("-3", 1), ("500", 50)):
+            with self.subTest(size=size):
+                response = self.client.get(self.url, {"q": "quel", "size": size})
+                self.assertEqual(response.status_code, 200)
+                body = mock_execute.call_args[0][0].to_dict()
+                self.assertEqual(body["suggest"]["suggestions"]["completion"]["size"], expected)
+
+    def test_suggest_contexts_include_year(self):
+        binding = BindingSurveyRepresentedVariable(
+            survey=self.survey, variable=self.variable, variable_name="Q1"
+        )
+        contexts = BindingSurveyDocument().prepare_suggest(binding)["contexts"]["scope"]
+        self.assertIn("all", contexts)
+        self.assertIn(f"survey:{self.survey.id}|year:2020", contexts)
+        self.assertIn(f"collection:{self.collection.id}|year:2020", contexts)
+
+
 class SearchResultsViewTest(BaseSearchViewTest):
+    def setUp(self):
+        invalidate_hierarchy()
+
     def test_search_results_view(self):
         response = self.client.get(
             reverse("request_ddi:search_results"),
@@ -1,20 +1,45 @@
+import glob
+import hashlib
+import json
+import os
+import tempfile
 import unittest
+from io import StringIO
+from pathlib import Path
 from unittest.mock import patch
 
 from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
+from request_ddi.core.data_importer import DataImporter
+from request_ddi.core.documents import BindingSurveyDocument
+from request_ddi.core.export_snapshots import (
+    get_snapshot,
+    invalidate_export_snapshots,
+    snapshot_key,
+    snapshot_version,
+    write_manifest,
+    write_snapshot,
+)
+from request_ddi.core.forms import CSVUploadFormCollection, XMLUploadForm
+from request_ddi.core.hierarchy import HIERARCHY_VERSION_KEY
 from request_ddi.core.models import (
     BindingSurveyRepresentedVariable,
     Collection,
     ConceptualVariable,
     Distributor,
+    ImportedFile,
     RepresentedVariable,
     Subcollection,
     Survey,
 )
+from request_ddi.core.parser import XMLParser
+from request_ddi.utils.codebooks import TEST_FILES_DIR
 
 from . import is_elasticsearch_available
 
@@ -80,6 +105,102 @@ class XMLUploadViewTest(BaseUploadTest):
                 )
                 self.assertEqual(response.status_code, 302)
 
+    @patch("request_ddi.core.data_importer.DataImporter.import_data", return_value=(1, 1, 1))
+    def test_identical_file_is_not_reimported(self, mock_import):
+        self.login()
+        survey = Survey.objects.create(name="ESS", external_ref="doi:1234/test")
+        xml_content = (
+            b"<root><IDNo>doi:1234/test</IDNo><var name='Q1'><labl>Age</labl>"
+            b"<qstn><qstnLit>Age ?</qstnLit></qstn><catgry><catValu>1</catValu></catgry></var></root>"
+        )
+
+        def post(**data):
+            xml_file = SimpleUploadedFile("test.xml", xml_content, content_type="text/xml")
+            return self.client.post(
+                reverse("request_ddi:upload_xml"), {"xml_file": xml_file, **data}
+            )
+
+        with patch(
+            "request_ddi.views.upload_views.XMLParser.parse_file",
+            return_value=[("doi:1234/test", "Q1", "Âge", "Quel âge ?", "", "", "")],
+        ) as mock_parse:
+            self.assertEqual(post().status_code, 302)
+            imported_file = ImportedFile.objects.get()
+            self.assertEqual(imported_file.survey, survey)
+            self.assertEqual(imported_file.summary["num_records"], 1)
+
+            with patch("request_ddi.core.forms.BeautifulSoup") as mock_soup:
+                response = post()
+            mock_soup.assert_not_called()
+            self.assertEqual(response.status_code, 302)
+            self.assertEqual(mock_parse.call_count, 1)
+            self.assertEqual(mock_import.call_count, 1)
+            self.assertIn(
+                "identique à celui importé",
+                str(list(get_messages(response.wsgi_request))[-1]),
+            )
+
+            post(force="on")
+            self.assertEqual(mock_parse.call_count, 2)
+            self.assertEqual(ImportedFile.objects.count(), 1)
+
+    @patch("request_ddi.core.data_importer.DataImporter.import_data", return_value=(1, 1, 1))
+    def test_previous_version_can_be_reimported(self, mock_import):
+        self.login()
+        Survey.objects.create(name="ESS", external_ref="doi:1234/test")
+        versions = [
+            f"<root><IDNo>doi:1234/test</IDNo><var name='Q1'><labl>Age</labl><qstn>"
+            f"<qstnLit>{question}</qstnLit></qstn><catgry><catValu>1</catValu></catgry></var>"
+            f"</root>".encode()
+            for question in ("Age ?", "Quel âge avez-vous ?")
+        ]
+
+        def post(content):
+            xml_file = SimpleUploadedFile("test.xml", content, content_type="text/xml")
+            return self.client.post(reverse("request_ddi:upload_xml"), {"xml_file": xml_file})
+
+        for content in (versions[0], versions[1], versions[0]):
+            self.assertEqual(post(content).status_code, 302)
+
+        # v1 → v2 → v1 : la dernière version envoyée est bien réimportée
+        self.assertEqual(mock_import.call_count, 3)
+        self.assertEqual(ImportedFile.objects.get().sha256, hashlib.sha256(versions[0]).hexdigest())
+
+    @patch("request_ddi.core.data_importer.DataImporter.import_data", return_value=(2, 2, 2))
+    def test_multiple_files_hashed_once_without_shared_summary(self, mock_import):
+        self.login()
+        Survey.objects.create(name="ESS", external_ref="doi:1234/test")
+        contents = [
+            f"<root><IDNo>doi:1234/test</IDNo><var name='Q{i}'><labl>Age</labl><qstn>"
+            f"<qstnLit>Age ?</qstnLit></qstn><catgry><catValu>1</catValu></catgry></var></root>"
+            for i in (1, 2)
+        ]
+        xml_files = [
+            SimpleUploadedFile(f"test{i}.xml", content.encode(), content_type="text/xml")
+            for i, content in enumerate(contents)
+        ]
+
+        with patch.object(
+            ImportedFile, "hash_file", side_effect=ImportedFile.hash_file
+        ) as mock_hash:
+            response = self.client.post(reverse("request_ddi:upload_xml"), {"xml_file": xml_files})
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(mock_hash.call_count, 2)
+        # Le bilan de l'envoi ne peut être attribué à aucun des deux fichiers
+        self.assertEqual(
+            list(ImportedFile.objects.order_by("file_name").values_list("file_name", "summary")),
+            [("test0.xml", {}), ("test1.xml", {})],
+        )
+
+        response = self.client.post(
+            reverse("request_ddi:upload_xml"),
+            {"xml_file": SimpleUploadedFile("again.xml", contents[0].encode())},
+        )
+        message = str(list(get_messages(response.wsgi_request))[-1])
+        self.assertIn("identique à celui importé", message)
+        self.assertNotIn("lignes ont été analysées", message)
+
     def test_form_invalid_with_invalid_xml(self):
         self.login()
         xml_content = b"<root></root>"
@@ -97,6 +218,204 @@ class XMLUploadViewTest(BaseUploadTest):
             self.assertEqual(response.status_code, 200)
 
 
+class IncrementalImportTest(TestCase):
+    def setUp(self):
+        patcher = patch.object(BindingSurveyDocument, "update")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        Survey.objects.create(name="ESS", external_ref="doi:incremental")
+
+    def question(self, name, question_text, universe="Tous"):
+        return (
+            "doi:incremental",
+            name,
+            name,
+            question_text,
+            r"10 \ 1 \ Oui \  | 5 \ 2 \ Non \ ",
+            universe,
+            "",
+        )
+
+    def test_unchanged_variables_are_skipped(self):
+        DataImporter().import_data(
+            [self.question("Q1", "Avez-vous voté ?"), self.question("Q2", "Quel âge ?")]
+        )
+        first = BindingSurveyRepresentedVariable.objects.get(variable_name="Q1")
+        self.assertEqual(len(first.content_hash), 64)
+
+        importer = DataImporter(incremental=True)
+        with patch.object(
+            DataImporter,
+            "get_or_create_represented_variable",
+            autospec=True,
+            side_effect=DataImporter.get_or_create_represented_variable,
+        ) as mock_get_or_create:
+            num_records, _, num_new_bindings = importer.import_data(
+                [
+                    self.question("Q1", "Avez-vous voté ?"),
+                    self.question("Q2", "Quel âge ?", universe="Adultes"),
+                ]
+            )
+
+        self.assertEqual((num_records, num_new_bindings, importer.num_unchanged), (2, 1, 1))
+        self.assertEqual(mock_get_or_create.call_count, 1)
+        self.assertEqual(BindingSurveyRepresentedVariable.objects.get(variable_name="Q1"), first)
+        second = BindingSurveyRepresentedVariable.objects.get(variable_name="Q2")
+        self.assertEqual(second.universe, "Adultes")
+
+        # Sans le mode incrémental, toutes les variables sont retraitées
+        importer = DataImporter()
+        importer.import_data([self.question("Q1", "Avez-vous voté ?")])
+        self.assertEqual(importer.num_unchanged, 0)
+
+
+class BenchmarkImportCommandTest(TestCase):
+    path = os.path.join(TEST_FILES_DIR, "fr.cdsp.elipss.2019.03.ea-ddi25.xml")
+
+    def setUp(self):
+        snapshots_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(snapshots_dir.cleanup)
+        settings_override = override_settings(EXPORT_SNAPSHOTS_DIR=snapshots_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        invalidate_export_snapshots()
+        write_manifest({snapshot_key(): write_snapshot(None, ["question\n"])}, snapshot_version())
+        cache.set(HIERARCHY_VERSION_KEY, "initial", None)
+        self.addCleanup(cache.delete, HIERARCHY_VERSION_KEY)
+
+    def test_benchmark_on_bundled_codebook(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            output = os.path.join(output_dir, "benchmark.json")
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command(
+                    "benchmark_import",
+                    self.path,
+                    "--output",
+                    output,
+                    stdout=StringIO(),
+                    stderr=StringIO(),
+                )
+            with open(output, encoding="utf-8") as output_file:
+                results = json.load(output_file)
+
+        self.assertEqual(results["metadata"]["surveys"], 4)
+        [result] = results["files"]
+        self.assertNotIn("errors", result)
+        self.assertGreater(result["variables"], 100)
+        self.assertGreater(result["queries"], 0)
+        self.assertGreater(result["es_bulk_calls"], 0)
+        self.assertGreaterEqual(result["es_documents"], result["variables"])
+        # Les données du benchmark sont annulées, les caches restent valides
+        self.assertFalse(Survey.objects.exists())
+        self.assertIsNotNone(get_snapshot())
+        self.assertEqual(cache.get(HIERARCHY_VERSION_KEY), "initial")
+
+    def test_kept_data_invalidates_caches(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command(
+                "benchmark_import", self.path, "--keep", stdout=StringIO(), stderr=StringIO()
+            )
+
+        self.assertTrue(Survey.objects.exists())
+        self.assertIsNone(get_snapshot())
+        self.assertNotEqual(cache.get(HIERARCHY_VERSION_KEY), "initial")
+
+
+class SyntheticCatalogueCommandTest(TestCase):
+    def generate(self, output_dir, seed=0):
+        call_command(
+            "generate_synthetic_catalogue",
+            output_dir,
+            "--surveys",
+            "4",
+            "--variables",
+            "30",
+            "--waves",
+            "2",
+            "--seed",
+            str(seed),
+            stdout=StringIO(),
+        )
+        return sorted(glob.glob(os.path.join(output_dir, "*.xml")))
+
+    def test_generated_catalogue(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            paths = self.generate(output_dir)
+            metadata = os.path.join(output_dir, "surveys.csv")
+
+            parsed = []
+            for path in paths:
+                with open(path, "rb") as xml_file:
+                    upload = SimpleUploadedFile(os.path.basename(path), xml_file.read())
+                    self.assertTrue(XMLUploadForm(files={"xml_file": upload}).is_valid())
+                    parsed.append(XMLParser().parse_file(upload, set()))
+            with open(metadata, "rb") as csv_file:
+                upload = SimpleUploadedFile("surveys.csv", csv_file.read())
+                self.assertTrue(CSVUploadFormCollection(files={"csv_file": upload}).is_valid())
+
+            output = os.path.join(output_dir, "benchmark.json")
+            call_command(
+                "benchmark_import",
+                *paths,
+                "--metadata",
+                metadata,
+                "--output",
+                output,
+                stdout=StringIO(),
+                stderr=StringIO(),
+            )
+            with open(output, encoding="utf-8") as output_file:
+                results = json.load(output_file)
+
+        self.assertEqual(len(paths), 4)
+        self.assertEqual([len(variables) for variables in parsed], [30] * 4)
+        # Les vagues d'une même série reprennent les mêmes questions
+        first_wave, second_wave = ({row[3] for row in variables} for variables in parsed[:2])
+        self.assertGreater(len(first_wave & second_wave), 10)
+        self.assertTrue(any(r"\ missing" in row[4] for variables in parsed for row in variables))
+
+        self.assertEqual(results["metadata"]["surveys"], 4)
+        self.assertEqual(results["total"]["variables"], 120)
+        self.assertFalse(any("errors" in result for result in results["files"]))
+
+    def test_same_seed_same_files(self):
+        def contents(seed):
+            with tempfile.TemporaryDirectory() as output_dir:
+                paths = self.generate(output_dir, seed)
+                return [Path(path).read_bytes() for path in paths]
+
+        self.assertEqual(contents(1), contents(1))
+        self.assertNotEqual(contents(1), contents(2))
+
+
+class BatchNormalizationTest(TestCase):
+    def test_file_texts_normalized_up_front(self):
+        importer = DataImporter()
+        importer.prepare_normalization(
+            [
+                (
+                    "doi:1",
+                    "Q1",
+                    "Q1",
+                    "Avez-vous voté?",
+                    r"1 \ 1 \ Oui \  | 1 \ 2 \ Non \ ",
+                    "",
+                    "",
+                ),
+                ("doi:1", "Q2", "Q2", "Avez-vous voté?", r"1 \ 1 \ Oui \ ", "", ""),
+                ("doi:1", "Q3", "Q3", "Âge ?", "mal formé", "", ""),
+            ]
+        )
+
+        self.assertEqual(
+            importer.for_database,
+            {"Avez-vous voté?": "Avez-vous voté ?", "Âge ?": "Âge ?", "Oui": "Oui", "Non": "Non"},
+        )
+        self.assertEqual(importer.normalize_for_comparison("Avez-vous voté ?"), "avez-vous vote ?")
+        # Texte non préparé : normalisation à la demande
+        self.assertEqual(importer.normalize_for_database("Peut-être?"), "Peut-être ?")
+
+
 class CSVUploadViewCollectionTest(BaseUploadTest):
     def test_form_valid_with_valid_csv(self):
         self.login()
@@ -139,6 +458,182 @@ class CSVUploadViewCollectionTest(BaseUploadTest):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json()["status"], "error")
 
+    def post_csv(self, csv_content):
+        csv_file = SimpleUploadedFile("test.csv", csv_content.encode(), content_type="text/csv")
+        return self.client.post(
+            reverse("request_ddi:upload_csv_collection"),
+            {"csv_file": csv_file, "delimiter": ","},
+        )
+
+    def test_batched_import_of_many_surveys(self):
+        self.login()
+        header = (
+            "distributor,collection,sous-collection,doi,title,xml_lang,author,producer,start_date,"
+            "geographic_coverage,geographic_unit,unit_of_analysis,contact,date_last_version\n"
+        )
+        lines = [
+            f"Distrib,Collection {i % 2},Vagues {i % 4},doi:{i},Survey {i},fr,A,P,20{i:02d},France,,Ind,c,2020-01\n"
+            for i in range(40)
+        ]
+
+        response = self.post_csv(header + "".join(lines))
+
+        self.assertEqual(response.json()["status"], "success")
+        self.assertEqual(Distributor.objects.count(), 1)
+        self.assertEqual(Collection.objects.count(), 2)
+        self.assertEqual(Subcollection.objects.count(), 4)
+        survey = Survey.objects.get(external_ref="doi:7")
+        self.assertEqual(survey.subcollection.name, "Vagues 3")
+        self.assertEqual(survey.subcollection.collection.name, "Collection 1")
+        self.assertEqual(survey.start_year, 2007)
+        self.assertEqual(str(survey.date_last_version), "2020-01-01")
+
+        # Ré-import à l'identique : rien n'est modifié ni signalé en erreur
+        self.assertEqual(self.post_csv(header + "".join(lines)).json()["status"], "success")
+        self.assertEqual(Survey.objects.count(), 40)
+
+    def test_invalid_row_imports_nothing(self):
+        self.login()
+        csv_content = (
+            "distributor,collection,sous-collection,doi,title,xml_lang,author,producer,start_date,"
+            "geographic_coverage,geographic_unit,unit_of_analysis,contact,date_last_version\n"
+            "Distrib,Collection,Subcollection,doi:1,Survey 1,fr,A,P,2020,France,,Ind,c,\n"
+            "Distrib,Collection,Subcollection,doi:2,Survey 2,fr,A,P,20XX,France,,Ind,c,\n"
+        )
+
+        response = self.post_csv(csv_content)
+
+        self.assertEqual(response.json()["status"], "error")
+        self.assertIn("ligne 2", response.json()["message"])
+        self.assertFalse(Distributor.objects.exists())
+        self.assertFalse(Survey.objects.exists())
+
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=0)
+    def test_streamed_import_in_chunks(self):
+        """Fichier écrit sur disque par Django et importé par paquets de 3 lignes."""
+        self.login()
+        header = (
+            "distributor;collection;sous-collection;doi;title;xml_lang;author;producer;start_date;"
+            "geographic_coverage;geographic_unit;unit_of_analysis;contact;date_last_version\n"
+        )
+        lines = [
+            f"Distrib;Collection;Vagues;doi:{i};Enquête {i};fr;A;P;2020;France;;Ind;c;\n"
+            for i in range(7)
+        ]
+        # Doublon à l'identique d'une ligne d'un paquet précédent
+        lines.append(lines[1])
+
+        with patch("request_ddi.views.upload_views.SURVEY_BATCH_SIZE", 3):
+            response = self.post_csv(header + "".join(lines))
+
+        self.assertEqual(response.json()["status"], "success")
+        self.assertEqual(Survey.objects.count(), 7)
+        self.assertEqual(Survey.objects.get(external_ref="doi:6").name, "Enquête 6")
+
+    def test_invalid_row_in_later_chunk_imports_nothing(self):
+        self.login()
+        header = (
+            "distributor,collection,sous-collection,doi,title,xml_lang,author,producer,start_date,"
+            "geographic_coverage,geographic_unit,unit_of_analysis,contact,date_last_version\n"
+        )
+        lines = [
+            f"Distrib,Collection,Vagues,doi:{i},Survey {i},fr,A,P,2020,France,,Ind,c,\n"
+            for i in range(5)
+        ]
+        lines.append("Distrib,Collection,Vagues,1234,Survey,fr,A,P,2020,France,,Ind,c,\n")
+
+        with patch("request_ddi.views.upload_views.SURVEY_BATCH_SIZE", 2):
+            response = self.post_csv(header + "".join(lines))
+
+        self.assertEqual(response.json()["status"], "error")
+        self.assertIn("ligne 6", response.json()["message"])
+        self.assertFalse(Survey.objects.exists())
+
+    @patch.object(BindingSurveyDocument, "update_index")
+    def test_upsert_updates_changed_surveys(self, mock_update_index):
+        self.login()
+        header = (
+            "distributor,collection,sous-collection,doi,title,xml_lang,author,producer,start_date,"
+            "geographic_coverage,geographic_unit,unit_of_analysis,contact,date_last_version\n"
+        )
+        first = "Distrib,Collection,Vagues,doi:1,Survey 1,fr,A,P,2018,France,,Ind,c,\n"
+        second = "Distrib,Collection,Vagues,doi:2,Survey 2,fr,A,P,2019,France,,Ind,c,\n"
+        self.post_csv(header + first + second)
+        with patch.object(BindingSurveyDocument, "update"):
+            BindingSurveyRepresentedVariable.objects.create(
+                survey=Survey.objects.get(external_ref="doi:1"),
+                variable=RepresentedVariable.objects.create(
+                    conceptual_var=ConceptualVariable.objects.create(internal_label="AGE"),
+                    question_text="Âge ?",
+                ),
+                variable_name="Q1",
+                is_indexed=True,
+            )
+        changed = "Distrib,Collection,Vagues,doi:1,Survey 1 bis,fr,A,P,2020,France,,Ind,c,\n"
+
+        # Sans le mode upsert, la modification reste refusée
+        response = self.post_csv(header + changed + second)
+        self.assertEqual(response.json()["status"], "error")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("request_ddi:upload_csv_collection"),
+                {
+                    "csv_file": SimpleUploadedFile(
+                        "test.csv",
+                        (header + changed + second).encode(),
+                        content_type="text/csv",
+                    ),
+                    "upsert": "on",
+                },
+            )
+
+        data = response.json()
+        self.assertEqual(data["status"], "success")
+        self.assertEqual(
+            data["updated"],
+            [
+                {
+                    "line": 1,
+                    "doi": "doi:1",
+                    "changes": {
+                        "name": {"old": "Survey 1", "new": "Survey 1 bis"},
+                        "start_date": {"old": "2018-01-01", "new": "2020-01-01"},
+                    },
+                }
+            ],
+        )
+        survey = Survey.objects.get(external_ref="doi:1")
+        self.assertEqual((survey.name, survey.start_year), ("Survey 1 bis", 2020))
+        self.assertEqual(Survey.objects.get(external_ref="doi:2").name, "Survey 2")
+        self.assertFalse(BindingSurveyRepresentedVariable.objects.get().is_indexed)
+        mock_update_index.assert_called_once()
+
+    def test_upsert_rejects_conflicting_rows_in_file(self):
+        self.login()
+        csv_content = (
+            "distributor,collection,sous-collection,doi,title,xml_lang,author,producer,start_date,"
+            "geographic_coverage,geographic_unit,unit_of_analysis,contact,date_last_version\n"
+            "Distrib,Collection,Vagues,doi:1,Survey 1,fr,A,P,2018,France,,Ind,c,\n"
+            "Distrib,Collection,Vagues,doi:1,Survey 1 bis,fr,A,P,2018,France,,Ind,c,\n"
+        )
+        csv_file = SimpleUploadedFile("test.csv", csv_content.encode(), content_type="text/csv")
+
+        response = self.client.post(
+            reverse("request_ddi:upload_csv_collection"), {"csv_file": csv_file, "upsert": "on"}
+        )
+
+        self.assertEqual(response.json()["status"], "error")
+        self.assertFalse(Survey.objects.exists())
+
+    def test_missing_columns(self):
+        self.login()
+        response = self.post_csv("doi,title\ndoi:1,Survey\n")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Les colonnes suivantes sont manquantes", str(response.json()["message"]))
+        self.assertFalse(Survey.objects.exists())
+
 
 @unittest.skipIf(not is_elasticsearch_available(), "elastic search is required for this test")
 class CheckDuplicatesTest(BaseUploadTest):
@@ -0,0 +1,7 @@
+# -- STDLIB
+import os
+
+# Codebooks DDI de test fournis avec l'application (benchmarks et tests)
+TEST_FILES_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "test_files"
+)
@@ -1,53 +1,114 @@
 # -- STDLIB
 import re
 import unicodedata
-
-
-def normalize_string_for_database(value):
-    if not isinstance(value, str):
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+# Nombre de chaînes normalisées gardées en mémoire (libellés récurrents : "Oui", "Non"...)
+NORMALIZE_CACHE_SIZE = 8192
+
+# Remplacements caractère par caractère, appliqués en un seul str.translate
+DATABASE_TRANSLATION = str.maketrans(
+    {
+        # Espaces insécables et assimilés → espace standard
+        "\u00a0": " ",
+        "\u202f": " ",
+        "\u2007": " ",
+        "\u2060": " ",
+        "\u2027": " ",
+        "\u00b7": " ",
+        # Guillemets typographiques → guillemets standards
+        "«": '"',
+        "»": '"',
+        "“": '"',
+        "”": '"',
+        # Apostrophes, tirets et points de suspension
+        "’": "'",  # noqa: RUF001
+        "–": "-",  # noqa: RUF001
+        "…": "...",
+    }
+)
+
+# Espace avant `? ;` et avant les guillemets (un seul passage pour les deux règles)
+SPACE_BEFORE_RE = re.compile(r'(?<!\s)([?;"])')
+# Espace après les guillemets
+SPACE_AFTER_QUOTE_RE = re.compile(r'(["])(?=\S)')
+ELLIPSIS_RE = re.compile(r"\.{3,}")
+
+
+class _CombiningMarks(dict):
+    """
+    Table de str.translate supprimant les diacritiques (catégorie Unicode "Mn") : chaque
+    caractère n'est classé qu'une fois, à sa première rencontre.
+    """
+
+    def __missing__(self, codepoint):
+        value = None if unicodedata.category(chr(codepoint)) == "Mn" else codepoint
+        self[codepoint] = value
         return value
 
-    # Normalisation Unicode (NFKC)
-    text = unicodedata.normalize("NFKC", value)
-
-    # Remplacement des espaces insécables par des espaces standards
-    text = re.sub(r"[\u00A0\u202F\u2007\u2060\u2027\u00B7]", " ", text)
-
-    # Remplacement des guillemets typographiques par des guillemets standards
-    text = text.replace("«", '"').replace("»", '"')
-    text = text.replace("“", '"').replace("”", '"')
-
-    # Ajout d'un espace avant les ponctuations suivantes : `? ;`
-    text = re.sub(r"(?<!\s)([?;])", r" \1", text)
-
-    # Ajout d'un espace après les guillemets
-    text = re.sub(r'(?<!\s)(["])', r" \1", text)
 
-    text = re.sub(r'(["])(?=\S)', r"\1 ", text)
+STRIP_COMBINING_MARKS = _CombiningMarks()
 
-    # Uniformisation des apostrophes et tirets
-    text = text.replace("’", "'").replace("–", "-")  # noqa: RUF001
 
-    # Remplacement des points de suspension et normalisation des espaces
-    text = text.replace("…", "...")
-    text = re.sub(r"\.{3,}", "...", text)
-
-    # Suppression des espaces en trop (double espaces, espaces en début et fin)
-    text = " ".join(text.split())
-
-    return text
+def normalize_string_for_database(value):
+    if not isinstance(value, str):
+        return value
+    return _normalize_for_database(value)
 
 
 def normalize_string_for_comparison(value):
     if not isinstance(value, str):
         return value
+    return _normalize_for_comparison(value)
 
-    # Normalisation Unicode pour décomposer les accents
-    text = unicodedata.normalize("NFD", value)
 
-    # Suppression des accents (en gardant uniquement les caractères ASCII)
-    text = "".join(char for char in text if unicodedata.category(char) != "Mn")
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def _normalize_for_database(text):
+    # Un texte ASCII est inchangé par NFKC et ne contient aucun caractère à remplacer
+    if not text.isascii():
+        text = unicodedata.normalize("NFKC", text).translate(DATABASE_TRANSLATION)
 
-    text = text.lower()
+    text = SPACE_BEFORE_RE.sub(r" \1", text)
+    text = SPACE_AFTER_QUOTE_RE.sub(r"\1 ", text)
+    text = ELLIPSIS_RE.sub("...", text)
 
-    return text
+    # Suppression des espaces en trop (double espaces, espaces en début et fin)
+    return " ".join(text.split())
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def _normalize_for_comparison(text):
+    # Un texte ASCII n'a ni accent ni forme décomposée
+    if not text.isascii():
+        # Décomposition des accents puis suppression des diacritiques
+        text = unicodedata.normalize("NFD", text).translate(STRIP_COMBINING_MARKS)
+    return text.lower()
+
+
+def clear_normalize_cache():
+    """Vide les caches de normalisation (ex. pour mesurer le coût à froid)."""
+    _normalize_for_database.cache_clear()
+    _normalize_for_comparison.cache_clear()
+
+
+def normalize_many(values, normalize=normalize_string_for_database, processes=None):
+    """
+    Normalise une suite de valeurs et retourne la liste des résultats, dans le même ordre.
+    Chaque chaîne distincte n'est traitée qu'une fois ; avec processes > 1, le travail est
+    réparti sur un pool de processus (rattrapages sur des tables entières, cf. commande
+    normalize_question_texts). `normalize` doit alors être une fonction de module,
+    transmissible aux processus.
+    """
+    values = list(values)
+    unique = list(dict.fromkeys(value for value in values if isinstance(value, str)))
+
+    if processes and processes > 1 and unique:
+        chunksize = max(1, len(unique) // (processes * 4))
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            results = list(executor.map(normalize, unique, chunksize=chunksize))
+    else:
+        results = [normalize(value) for value in unique]
+
+    normalized = dict(zip(unique, results))
+    return [normalized[value] if isinstance(value, str) else value for value in values]
@@ -5,3 +5,15 @@ import re
 def alphanum_key(s):
     """Fonction pour extraire les parties numériques et non numériques."""
     return [int(text) if text.isdigit() else text.lower() for text in re.split("([0-9]+)", s)]
+
+
+def category_sort_key(code):
+    """
+    Clé de tri canonique d'une catégorie : les codes numériques d'abord, dans l'ordre
+    numérique, puis les codes textuels dans l'ordre alphabétique.
+    La clé est une chaîne pour pouvoir être stockée et triée directement en base.
+    """
+    if code.isascii() and code.isdigit():
+        number = code.lstrip("0") or "0"
+        return f"0{len(number):03d}{number}{code}"
+    return f"1{code}"
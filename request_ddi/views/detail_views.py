@@ -1,4 +1,5 @@
 # -- DJANGO
+from django.core.paginator import Paginator
 from django.shortcuts import get_object_or_404, render
 from django.utils.decorators import method_decorator
 from django.views import View
@@ -7,74 +8,104 @@ from django.views import View
 from request_ddi.core.models import BindingSurveyRepresentedVariable, BindingVariableCategoryStat
 from request_ddi.utils.timer import log_time
 
+# Nombre de questions identiques / similaires affichées par page
+SIMILAR_PAGE_SIZE = 50
+
+
+def bindings_with_categories():
+    """Bindings avec enquête, variables et catégories (triées) chargées en deux requêtes."""
+    return BindingSurveyRepresentedVariable.objects.select_related(
+        "survey", "variable__conceptual_var"
+    ).prefetch_related("variable__categories")
+
+
+def page_urls(request, page, parameter):
+    """
+    Liens vers les pages précédente et suivante : paramètres GET actuels, numéro de page
+    remplacé (équivalent de la balise {% querystring %}, absente avant Django 5.1).
+    """
+    urls = {}
+    for name, has_page, get_number in (
+        ("previous", page.has_previous, page.previous_page_number),
+        ("next", page.has_next, page.next_page_number),
+    ):
+        if has_page():
+            params = request.GET.copy()
+            params[parameter] = get_number()
+            urls[name] = f"?{params.urlencode()}"
+    return urls
+
 
 @method_decorator(log_time, name="dispatch")
 class QuestionDetailView(View):
     def get(self, request, id_quest, *args, **kwargs):
         search_params = request.GET.urlencode()
-        question = get_object_or_404(BindingSurveyRepresentedVariable, id=id_quest)
+        question = get_object_or_404(bindings_with_categories(), id=id_quest)
         question_represented_var = question.variable
         question_conceptual_var = question_represented_var.conceptual_var
         question_survey = question.survey
 
-        categories_percentages = []
-        category_stats = BindingVariableCategoryStat.objects.filter(
-            binding=question
-        ).select_related("category")
+        categories = list(question_represented_var.ordered_categories)
 
-        # Tri des catégories
-        categories = sorted(
-            question.variable.categories.all(),
-            key=lambda x: (int(x.code) if x.code.isdigit() else float("inf"), x.code),
-        )
-
-        non_missing_categories = [cat for cat in categories if not cat.missing]
-        stat_map = {cs.category_id: cs.stat for cs in category_stats}
-        sum_categories_cases = sum(
-            stat_map[cat.id] for cat in non_missing_categories if cat.id in stat_map
+        stat_map = dict(
+            BindingVariableCategoryStat.objects.filter(binding=question).values_list(
+                "category_id", "stat"
+            )
         )
-
+        sum_categories_cases = sum(stat_map.get(cat.id, 0) for cat in categories if not cat.missing)
+        # Pourcentages rapportés au total des modalités non manquantes, y compris pour les
+        # modalités manquantes (non affichés par le gabarit) ; 0 pour une modalité sans effectif
         categories_percentages = [
-            (stat_map[cat.id] * 100 / sum_categories_cases)
-            if sum_categories_cases != 0 and not cat.missing
+            (stat_map.get(cat.id, 0) * 100 / sum_categories_cases)
+            if sum_categories_cases != 0
             else 0
             for cat in categories
         ]
 
-        similar_representative_questions = BindingSurveyRepresentedVariable.objects.filter(
-            variable=question.variable, variable__is_unique=False
-        ).exclude(id=question.id)
-
-        similar_conceptual_questions = (
-            BindingSurveyRepresentedVariable.objects.filter(
-                variable__conceptual_var=question.variable.conceptual_var,
-                variable__conceptual_var__is_unique=False,
-            )
-            .exclude(id=question.id)
-            .exclude(id__in=similar_representative_questions.values_list("id", flat=True))
+        # Les ids des bindings frères sont lus dans le cache des variables (déjà chargées),
+        # seules les questions de la page affichée sont ensuite récupérées
+        representative_ids = (
+            []
+            if question_represented_var.is_unique
+            else [i for i in question_represented_var.get_sibling_binding_ids() if i != question.id]
+        )
+        excluded_ids = {question.id, *representative_ids}
+        conceptual_ids = (
+            []
+            if question_conceptual_var.is_unique
+            else [
+                i
+                for i in question_conceptual_var.get_sibling_binding_ids()
+                if i not in excluded_ids
+            ]
         )
 
-        for q in similar_representative_questions:
-            q.categories = sorted(
-                q.variable.categories.all(),
-                key=lambda x: (
-                    int(x.code) if x.code.isdigit() else float("inf"),
-                    x.code,
-                ),
-            )
+        similar_representative_page = Paginator(representative_ids, SIMILAR_PAGE_SIZE).get_page(
+            request.GET.get("similar_page")
+        )
+        similar_conceptual_page = Paginator(conceptual_ids, SIMILAR_PAGE_SIZE).get_page(
+            request.GET.get("concept_page")
+        )
+        similar_representative_urls = page_urls(
+            request, similar_representative_page, "similar_page"
+        )
+        similar_conceptual_urls = page_urls(request, similar_conceptual_page, "concept_page")
 
-        for q in similar_conceptual_questions:
-            q.categories = sorted(
-                q.variable.categories.all(),
-                key=lambda x: (
-                    int(x.code) if x.code.isdigit() else float("inf"),
-                    x.code,
-                ),
-            )
+        page_bindings = bindings_with_categories().filter(
+            id__in=[*similar_representative_page, *similar_conceptual_page],
+            variable__conceptual_var=question_conceptual_var,
+        )
+        bindings_by_id = {}
+        for q in page_bindings:
+            q.categories = list(q.variable.ordered_categories)
+            bindings_by_id[q.id] = q
 
-        categories_percentages = [
-            (stat_map[cat.id] * 100 / sum_categories_cases) if sum_categories_cases != 0 else 0
-            for cat in categories
+        similar_representative_questions = [
+            bindings_by_id[i] for i in similar_representative_page if i in bindings_by_id
         ]
+        similar_conceptual_questions = [
+            bindings_by_id[i] for i in similar_conceptual_page if i in bindings_by_id
+        ]
+
         context = locals()
         return render(request, "question_detail.html", context)
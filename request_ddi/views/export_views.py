@@ -1,25 +1,59 @@
-# -- DJANGO
+# -- STDLIB
 import csv
+import itertools
+import logging
+import tempfile
 
-from django.http import HttpResponse
+# -- DJANGO
+from django.db.models import Count, Max, Prefetch
+from django.http import FileResponse, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
+from django.utils.cache import get_conditional_response, quote_etag
 from django.utils.decorators import method_decorator
+from django.utils.http import http_date
 from django.views import View
 
 # -- LOCAL
+from request_ddi.core.export_snapshots import get_snapshot
 from request_ddi.core.models import (
     BindingSurveyRepresentedVariable,
     Collection,
+    RepresentedVariable,
     Subcollection,
     Survey,
 )
 from request_ddi.utils.timer import log_time
 from request_ddi.views.mixins import staff_required_html
+from request_ddi.views.search_views import SearchResultsDataView
+
+logger = logging.getLogger(__name__)
+
+# Nombre de lignes lues par aller-retour avec le curseur serveur en mode streaming
+EXPORT_STREAM_CHUNK_SIZE = 2000
+
+# Formats colonnes (pyarrow) : type MIME et extension du fichier
+COLUMNAR_FORMATS = {
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.file", "arrow"),
+}
+# Taille au-delà de laquelle le fichier colonnes généré est écrit sur disque
+COLUMNAR_SPOOL_MAX_SIZE = 50 * 1024 * 1024
+
+
+class Echo:
+    """Pseudo-tampon pour csv.writer : write() renvoie la ligne au lieu de la stocker."""
+
+    def write(self, value):
+        return value
 
 
 @method_decorator(log_time, name="dispatch")
 class ExportQuestionsCSVView(View):
     def get(self, request, *args, **kwargs):
+        snapshot_response = self._snapshot_response(request)
+        if snapshot_response is not None:
+            return snapshot_response
+
         selected_ids = request.GET.getlist("ids")
         survey_ids = request.GET.getlist("survey")
         collection_ids = request.GET.getlist("collections")
@@ -28,11 +62,6 @@ class ExportQuestionsCSVView(View):
 
         years = self._parse_years(raw_years)
 
-        response = HttpResponse(content_type="text/csv")
-        response["Content-Disposition"] = 'attachment; filename="questions_export.csv"'
-
-        writer = csv.writer(response)
-
         questions = self._filter_questions(
             selected_ids=selected_ids,
             survey_ids=survey_ids,
@@ -41,7 +70,29 @@ class ExportQuestionsCSVView(View):
             years=years,
         )
 
-        questions_data, max_vars = self._collect_questions_data(questions)
+        # Une ligne par variable représentée plutôt qu'une par binding sélectionné
+        if request.GET.get("group_by") == "variable":
+            items = self._export_variables(questions)
+            to_data = self._variable_data
+        else:
+            items = self._with_export_relations(questions)
+            to_data = self._question_data
+
+        export_format = request.GET.get("format", "csv")
+        if export_format in COLUMNAR_FORMATS:
+            return self._columnar_response(items, to_data, export_format)
+        if export_format != "csv":
+            return JsonResponse({"error": f"Format d'export inconnu : {export_format}"}, status=400)
+
+        if request.GET.get("stream") in {"1", "true"}:
+            return self._stream_response(questions, items, to_data)
+
+        response = HttpResponse(content_type="text/csv")
+        response["Content-Disposition"] = 'attachment; filename="questions_export.csv"'
+
+        writer = csv.writer(response)
+
+        questions_data, max_vars = self._collect_questions_data(items, to_data)
 
         dataset_var_headers = [f"dataset_var{i + 1}" for i in range(max_vars)]
         writer.writerow(["question_text", "categories", "variable_label", *dataset_var_headers])
@@ -58,6 +109,171 @@ class ExportQuestionsCSVView(View):
 
         return response
 
+    # -------------------------
+    # Streaming
+    # -------------------------
+
+    def _stream_response(self, questions, items, to_data):
+        """
+        Export en flux : la largeur de l'en-tête est obtenue par une seule agrégation,
+        puis les lignes sont écrites au fil de la lecture du curseur serveur, sans
+        jamais charger l'ensemble des résultats en mémoire.
+        """
+        response = StreamingHttpResponse(
+            self.csv_lines(questions, items, to_data), content_type="text/csv"
+        )
+        response["Content-Disposition"] = 'attachment; filename="questions_export.csv"'
+        return response
+
+    def csv_lines(self, questions, items, to_data):
+        """Lignes CSV déjà encodées de l'export, en-tête compris."""
+        max_vars = self._max_vars(questions)
+        writer = csv.writer(Echo())
+
+        dataset_var_headers = [f"dataset_var{i + 1}" for i in range(max_vars)]
+        yield writer.writerow(
+            ["question_text", "categories", "variable_label", *dataset_var_headers]
+        )
+        for item in items.iterator(chunk_size=EXPORT_STREAM_CHUNK_SIZE):
+            data = to_data(item)
+            yield writer.writerow(
+                [
+                    data["question_text"],
+                    data["categories"],
+                    data["variable_label"],
+                    *data["dataset_vars"],
+                    *[""] * (max_vars - len(data["dataset_vars"])),
+                ]
+            )
+
+    def snapshot_lines(self, collection_id=None):
+        """Lignes de l'export complet, ou d'une collection, pré-généré sur disque."""
+        questions = self._filter_questions(
+            selected_ids=[],
+            survey_ids=[],
+            collection_ids=[collection_id] if collection_id is not None else [],
+            sub_collection_ids=[],
+            years=[],
+        )
+        return self.csv_lines(
+            questions, self._with_export_relations(questions), self._question_data
+        )
+
+    # -------------------------
+    # Exports pré-générés
+    # -------------------------
+
+    def _snapshot_response(self, request):
+        """
+        Sert l'export pré-généré correspondant à la requête (export complet ou d'une
+        seule collection, au format CSV par défaut), avec gestion du GET conditionnel.
+        Retourne None si la requête ne correspond à aucun export pré-généré.
+        """
+        params = {
+            key: [value for value in request.GET.getlist(key) if value] for key in request.GET
+        }
+        filters = {key: values for key, values in params.items() if values and key != "stream"}
+        if set(filters) - {"collections", "format"} or filters.get("format", ["csv"]) != ["csv"]:
+            return None
+
+        collection_ids = filters.get("collections", [])
+        if len(collection_ids) > 1 or not all(value.isdigit() for value in collection_ids):
+            return None
+
+        snapshot = get_snapshot(int(collection_ids[0]) if collection_ids else None)
+        if snapshot is None:
+            return None
+
+        etag = quote_etag(snapshot.etag)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=snapshot.last_modified
+        )
+        if response is None:
+            response = FileResponse(
+                open(snapshot.path, "rb"),  # noqa: SIM115
+                as_attachment=True,
+                filename="questions_export.csv",
+                content_type="text/csv",
+            )
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(snapshot.last_modified)
+        return response
+
+    # -------------------------
+    # Formats colonnes
+    # -------------------------
+
+    def _columnar_response(self, items, to_data, export_format):
+        """
+        Export au format long (une ligne par variable de jeu de données) en Parquet ou
+        Arrow IPC. Les lignes sont écrites par lots dans un fichier temporaire.
+        """
+        try:
+            import pyarrow as pa  # noqa: PLC0415
+            import pyarrow.parquet as pq  # noqa: PLC0415
+        except ImportError:
+            return JsonResponse(
+                {"error": "L'export Parquet / Arrow nécessite pyarrow (extra « columnar »)"},
+                status=400,
+            )
+
+        schema = pa.schema(
+            [
+                ("question_text", pa.string()),
+                (
+                    "categories",
+                    pa.list_(pa.struct([("code", pa.string()), ("label", pa.string())])),
+                ),
+                ("variable_label", pa.string()),
+                ("dataset_var", pa.string()),
+            ]
+        )
+        output = tempfile.SpooledTemporaryFile(max_size=COLUMNAR_SPOOL_MAX_SIZE)  # noqa: SIM115
+        if export_format == "parquet":
+            writer = pq.ParquetWriter(output, schema)
+        else:
+            writer = pa.ipc.new_file(output, schema)
+
+        columns = {name: [] for name in schema.names}
+
+        def write_batch():
+            writer.write_batch(pa.RecordBatch.from_pydict(columns, schema=schema))
+            for values in columns.values():
+                values.clear()
+
+        for item in items.iterator(chunk_size=EXPORT_STREAM_CHUNK_SIZE):
+            data = to_data(item)
+            categories = [{"code": code, "label": label} for code, label in data["category_list"]]
+            for dataset_var in data["dataset_vars"] or [None]:
+                columns["question_text"].append(data["question_text"])
+                columns["categories"].append(categories)
+                columns["variable_label"].append(data["variable_label"])
+                columns["dataset_var"].append(dataset_var)
+            if len(columns["dataset_var"]) >= EXPORT_STREAM_CHUNK_SIZE:
+                write_batch()
+
+        if columns["dataset_var"]:
+            write_batch()
+        writer.close()
+        output.seek(0)
+
+        content_type, extension = COLUMNAR_FORMATS[export_format]
+        return FileResponse(
+            output,
+            as_attachment=True,
+            filename=f"questions_export.{extension}",
+            content_type=content_type,
+        )
+
+    def _max_vars(self, questions):
+        """Nombre maximal de bindings par variable représentée parmi les questions exportées."""
+        result = (
+            RepresentedVariable.objects.filter(id__in=questions.values("variable_id"))
+            .annotate(nb_bindings=Count("bindingsurveyrepresentedvariable"))
+            .aggregate(max_vars=Max("nb_bindings"))
+        )
+        return result["max_vars"] or 0
+
     # -------------------------
     # Helpers
     # -------------------------
@@ -97,40 +313,130 @@ class ExportQuestionsCSVView(View):
             qs = qs.filter(survey__subcollection__id__in=sub_collection_ids)
 
         if years:
-            qs = qs.filter(survey__start_date__year__in=years)
+            qs = qs.filter(survey__start_year__in=years)
 
         return qs.distinct()
 
-    def _collect_questions_data(self, questions):
+    def _with_export_relations(self, questions):
+        """
+        Précharge tout ce qu'écrit une ligne d'export (variable, catégories, bindings
+        frères et leur enquête) : le nombre de requêtes ne dépend plus du volume exporté.
+        """
+        return questions.select_related("variable").prefetch_related(
+            "variable__categories",
+            Prefetch(
+                "variable__bindingsurveyrepresentedvariable_set", queryset=self._sibling_bindings()
+            ),
+        )
+
+    def _export_variables(self, questions):
+        """Variables représentées des questions filtrées, chacune lue une seule fois."""
+        return (
+            RepresentedVariable.objects.filter(id__in=questions.values("variable_id"))
+            .order_by("id")
+            .prefetch_related(
+                "categories",
+                Prefetch("bindingsurveyrepresentedvariable_set", queryset=self._sibling_bindings()),
+            )
+        )
+
+    def _sibling_bindings(self):
+        """Bindings d'une variable avec les seuls champs écrits dans la colonne dataset_var."""
+        return BindingSurveyRepresentedVariable.objects.select_related("survey").only(
+            "variable_id", "variable_name", "survey__external_ref"
+        )
+
+    def _collect_questions_data(self, items, to_data):
         questions_data = []
         max_vars = 0
 
-        for question in questions:
-            represented_var = question.variable
+        for item in items:
+            data = to_data(item)
+            max_vars = max(max_vars, len(data["dataset_vars"]))
+            questions_data.append(data)
 
-            categories = " | ".join(
-                f"{cat.code},{cat.category_label}" for cat in represented_var.categories.all()
-            )
+        return questions_data, max_vars
 
-            associated_bindings = represented_var.bindingsurveyrepresentedvariable_set.all()
+    def _question_data(self, question):
+        return self._variable_data(question.variable)
 
-            dataset_vars = [
-                f"urn:ddi.cdsp:{binding.survey.external_ref}:{binding.variable_name}"
-                for binding in associated_bindings
-            ]
+    def _variable_data(self, represented_var):
+        category_list = [(cat.code, cat.category_label) for cat in represented_var.categories.all()]
+        categories = " | ".join(f"{code},{label}" for code, label in category_list)
 
-            max_vars = max(max_vars, len(dataset_vars))
+        associated_bindings = represented_var.bindingsurveyrepresentedvariable_set.all()
 
-            questions_data.append(
-                {
-                    "question_text": represented_var.question_text,
-                    "categories": categories,
-                    "variable_label": represented_var.internal_label,
-                    "dataset_vars": dataset_vars,
-                }
-            )
+        dataset_vars = [
+            f"urn:ddi.cdsp:{binding.survey.external_ref}:{binding.variable_name}"
+            for binding in associated_bindings
+        ]
 
-        return questions_data, max_vars
+        return {
+            "question_text": represented_var.question_text,
+            "categories": categories,
+            "category_list": category_list,
+            "variable_label": represented_var.internal_label,
+            "dataset_vars": dataset_vars,
+        }
+
+
+@method_decorator(log_time, name="dispatch")
+class ExportSearchResultsCSVView(SearchResultsDataView):
+    """
+    Export CSV de la recherche courante : reçoit le même payload POST que
+    SearchResultsDataView et parcourt tous les résultats Elasticsearch via un point
+    in time + search_after, une ligne par binding, écrite au fil de l'eau (colonne
+    dataset_var unique : format distinct de celui d'ExportQuestionsCSVView).
+    """
+
+    keep_alive = "2m"
+    page_size = 1000
+    source_fields = [  # noqa: RUF012
+        "variable_name",
+        "survey.external_ref",
+        "variable.question_text",
+        "variable.internal_label",
+        "variable.categories",
+    ]
+
+    def post(self, request, *args, **kwargs):
+        search = (
+            self.build_filtered_search(highlight=False)
+            .source(self.source_fields)
+            .extra(size=self.page_size)
+        )
+        try:
+            hits = search.iterate(keep_alive=self.keep_alive)
+            # Ouvre le point in time avant de commencer la réponse pour pouvoir signaler une erreur
+            first_hit = next(hits, None)
+        except Exception as e:
+            logger.exception("❌ Erreur dans ExportSearchResultsCSVView.post() : %s", e)
+            return JsonResponse({"error": str(e)}, status=500)
+
+        writer = csv.writer(Echo())
+
+        def rows():
+            yield writer.writerow(["question_text", "categories", "variable_label", "dataset_var"])
+            if first_hit is None:
+                return
+            for hit in itertools.chain([first_hit], hits):
+                yield writer.writerow(self.hit_row(hit))
+
+        response = StreamingHttpResponse(rows(), content_type="text/csv")
+        response["Content-Disposition"] = 'attachment; filename="search_export.csv"'
+        return response
+
+    def hit_row(self, hit):
+        variable = hit.variable
+        categories = " | ".join(
+            f"{cat.code},{cat.category_label}" for cat in getattr(variable, "categories", [])
+        )
+        return [
+            getattr(variable, "question_text", ""),
+            categories,
+            getattr(variable, "internal_label", ""),
+            f"urn:ddi.cdsp:{hit.survey.external_ref}:{hit.variable_name}",
+        ]
 
 
 @log_time
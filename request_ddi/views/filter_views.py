@@ -2,11 +2,8 @@
 from django.http import JsonResponse
 
 # --LOCAL
-from request_ddi.core.models import (
-    Subcollection,
-    Survey,
-)
-from request_ddi.utils.sort import alphanum_key
+from request_ddi.core.hierarchy import get_hierarchy
+from request_ddi.core.models import Survey
 from request_ddi.utils.timer import log_time
 
 
@@ -30,21 +27,9 @@ def get_subcollections_by_collections(request):
     collection_ids = request.GET.get("collections_ids", "").split(",")
     collection_ids = [id_coll for id_coll in collection_ids if id_coll]
 
-    if not collection_ids:
-        subcollections = Subcollection.objects.all().order_by("name")
-        surveys = Survey.objects.all().order_by("name")
-    else:
-        subcollections = Subcollection.objects.filter(collection_id__in=collection_ids).order_by(
-            "name"
-        )
-        surveys = Survey.objects.filter(subcollection__collection_id__in=collection_ids).order_by(
-            "name"
-        )
-
-    surveys = list(surveys)
-    subcollections = list(subcollections)
-    subcollections.sort(key=lambda sc: alphanum_key(sc.name))
-    surveys.sort(key=lambda s: alphanum_key(s.name))
+    hierarchy = get_hierarchy()
+    subcollections = hierarchy.get_subcollections(collection_ids)
+    surveys = hierarchy.get_surveys(collection_ids=collection_ids)
 
     data = {
         "subcollections": [{"id": sc.id, "name": sc.name} for sc in subcollections],
@@ -58,22 +43,12 @@ def get_subcollections_by_collections(request):
 def get_surveys_by_subcollections(request):
     subcollection_ids = request.GET.get("subcollections_ids", "").split(",")
     subcollection_ids = [id_sub for id_sub in subcollection_ids if id_sub]
+    collection_ids = request.GET.get("collections_ids", "").split(",")
+    collection_ids = [id_coll for id_coll in collection_ids if id_coll]
 
-    if not subcollection_ids:
-        collection_ids = request.GET.get("collections_ids", "").split(",")
-        collection_ids = [id_coll for id_coll in collection_ids if id_coll]
-
-        if collection_ids:
-            surveys = Survey.objects.filter(
-                subcollection__collection_id__in=collection_ids
-            ).order_by("name")
-        else:
-            surveys = Survey.objects.all().order_by("name")
-    else:
-        surveys = Survey.objects.filter(subcollection_id__in=subcollection_ids).order_by("name")
-
-    surveys = list(surveys)
-    surveys.sort(key=lambda s: alphanum_key(s.name))
+    surveys = get_hierarchy().get_surveys(
+        collection_ids=collection_ids, subcollection_ids=subcollection_ids
+    )
 
     data = {"surveys": [{"id": s.id, "name": s.name} for s in surveys]}
     return JsonResponse(data)
@@ -89,27 +64,7 @@ def get_decades(request):
     subcollection_ids = [id_sub for id_sub in subcollection_ids if id_sub]
     survey_ids = [id_sur for id_sur in survey_ids if id_sur]
 
-    if survey_ids:
-        surveys = Survey.objects.filter(id__in=survey_ids)
-    elif subcollection_ids:
-        surveys = Survey.objects.filter(subcollection_id__in=subcollection_ids)
-    elif collection_ids:
-        surveys = Survey.objects.filter(subcollection__collection_id__in=collection_ids)
-    else:
-        surveys = Survey.objects.all()
-
-    years = surveys.values_list("start_date", flat=True).distinct()
-
-    years = [year.year for year in years if year is not None]
-    years = list(set(years))
-    years.sort(reverse=True)
-
-    decades = {}
-    for year in years:
-        decade = (year // 10) * 10
-        if decade not in decades:
-            decades[decade] = []
-        decades[decade].append(year)
+    decades = get_hierarchy().get_decades(collection_ids, subcollection_ids, survey_ids)
     return JsonResponse({"decades": decades})
 
 
@@ -129,22 +84,10 @@ def get_years_by_decade(request):
     subcollection_ids = [id_sub for id_sub in subcollection_ids if id_sub]
     survey_ids = [id_sur for id_sur in survey_ids if id_sur]
 
-    if survey_ids:
-        surveys = Survey.objects.filter(id__in=survey_ids)
-    elif subcollection_ids:
-        surveys = Survey.objects.filter(subcollection_id__in=subcollection_ids)
-    elif collection_ids:
-        surveys = Survey.objects.filter(subcollection__collection_id__in=collection_ids)
-    else:
-        surveys = Survey.objects.all()
-
-    years = (
-        surveys.filter(start_date__year__range=(start_year, end_year))
-        .values_list("start_date__year", flat=True)
-        .distinct()
-    )
-    years = list(set(years))
-
-    years.sort()
+    years = [
+        year
+        for year in get_hierarchy().get_years(collection_ids, subcollection_ids, survey_ids)
+        if start_year <= year <= end_year
+    ]
 
     return JsonResponse({"years": years})
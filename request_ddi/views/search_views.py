@@ -6,22 +6,37 @@ from django.http import JsonResponse
 from django.shortcuts import render
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.gzip import gzip_page
 
 # -- DJANGO
 from django.views.generic import ListView
 
-# -- THIRDPARTY
-from elasticsearch.dsl import Q
-
 # -- LOCAL
-from request_ddi.core.documents import BindingSurveyDocument
-from request_ddi.core.models import Collection, RepresentedVariable, Subcollection, Survey
+from request_ddi.core.documents import SUGGEST_CONTEXT, BindingSurveyDocument, suggest_scope
+from request_ddi.core.hierarchy import get_hierarchy
+from request_ddi.core.models import Collection, RepresentedVariable
 from request_ddi.utils.timer import log_time
 
 from .utils_views import remove_html_tags
 
 logger = logging.getLogger(__name__)
 
+# Champ Elasticsearch surligné pour chaque emplacement de recherche
+HIGHLIGHT_FIELDS = {
+    "questions": "variable.question_text",
+    "categories": "variable.categories.category_label",
+    "variable_name": "variable_name",
+    "internal_label": "variable.internal_label",
+}
+
+SUGGEST_DEFAULT_SIZE = 10
+SUGGEST_MAX_SIZE = 50
+
+
+def parse_ids(values):
+    """Convertit une liste de valeurs de formulaire en identifiants entiers."""
+    return [int(value) for value in values if value.isdigit()]
+
 
 @method_decorator(log_time, name="dispatch")
 class RepresentedVariableSearchView(ListView):
@@ -38,6 +53,7 @@ class RepresentedVariableSearchView(ListView):
 
 
 @method_decorator(log_time, name="dispatch")
+@method_decorator(gzip_page, name="dispatch")
 class SearchResultsDataView(ListView):
     model = BindingSurveyDocument
     context_object_name = "results"
@@ -57,7 +73,7 @@ class SearchResultsDataView(ListView):
             ]
         return super().dispatch(*args, **kwargs)
 
-    def build_filtered_search(self):
+    def build_filtered_search(self, highlight=True):
         search_value = self.request.POST.get("q", "").strip().lower()
         search_value = unescape(search_value)
 
@@ -70,34 +86,17 @@ class SearchResultsDataView(ListView):
         collections_filter = self.request.POST.getlist("collections[]", None)
         years = self.request.POST.getlist("years[]", [])
 
-        survey_filter = [int(survey_id) for survey_id in survey_filter if survey_id.isdigit()]
-        subcollection_filter = [
-            int(subcollection_id)
-            for subcollection_id in subcollection_filter
-            if subcollection_id.isdigit()
-        ]
-        collections_filter = [
-            int(collection_id) for collection_id in collections_filter if collection_id.isdigit()
-        ]
-        years = [int(year) for year in years if year.isdigit()]
+        survey_filter = parse_ids(survey_filter)
+        subcollection_filter = parse_ids(subcollection_filter)
+        collections_filter = parse_ids(collections_filter)
+        years = parse_ids(years)
 
         search = BindingSurveyDocument.search()
 
         if search_value:
             search = self.apply_search_filters(search, search_value, search_locations)
-
-        search = (
-            search.highlight_options(
-                pre_tags=['<mark style="background-color: rgba(255, 70, 78, 0.15);">'],
-                post_tags=["</mark>"],
-                number_of_fragments=0,
-                fragment_size=10000,
-            )
-            .highlight("variable.question_text", fragment_size=10000)
-            .highlight("variable.categories.category_label", fragment_size=10000)
-            .highlight("variable_name", fragment_size=10000)
-            .highlight("variable.internal_label", fragment_size=10000)
-        )
+            if highlight:
+                search = self.apply_highlight(search, search_locations)
 
         if survey_filter:
             search = search.filter("terms", **{"survey.id": survey_filter})
@@ -109,21 +108,7 @@ class SearchResultsDataView(ListView):
             )
 
         if years:
-            # Construire des filtres de range pour chaque année sélectionnée
-            year_filters = [
-                Q(
-                    "range",
-                    **{
-                        "survey.start_date": {
-                            "gte": f"{year}-01-01",
-                            "lt": f"{year + 1}-01-01",
-                        }
-                    },
-                )
-                for year in years
-            ]
-            # Appliquer les filtres avec un bool should pour les combiner
-            search = search.query("bool", should=year_filters, minimum_should_match=1)
+            search = search.filter("terms", **{"survey.start_year": years})
 
         return search
 
@@ -135,6 +120,22 @@ class SearchResultsDataView(ListView):
         response = search[start : start + limit].execute()
         return response
 
+    def apply_highlight(self, search, search_locations):
+        """Surligne uniquement les champs des emplacements de recherche actifs."""
+        highlight_fields = [
+            HIGHLIGHT_FIELDS[location]
+            for location in search_locations
+            if location in HIGHLIGHT_FIELDS
+        ]
+        if not highlight_fields:
+            return search
+        return search.highlight_options(
+            type="unified",
+            pre_tags=['<mark style="background-color: rgba(255, 70, 78, 0.15);">'],
+            post_tags=["</mark>"],
+            number_of_fragments=0,
+        ).highlight(*highlight_fields)
+
     def apply_search_filters(self, search, search_value, search_locations):
         queries = []
         terms = search_value.split()
@@ -272,7 +273,25 @@ class SearchResultsDataView(ListView):
             search = search.query("bool", should=queries, minimum_should_match=1)
         return search
 
-    def format_search_results(self, response, search_locations):  # noqa: C901
+    def render_categories_table(self, categories, matched_label):
+        """Construit le tableau HTML des catégories d'un résultat."""
+        rows = []
+        # Catégories déjà triées à l'indexation
+        for cat in categories:
+            code = getattr(cat, "code", "N/A")
+            label = getattr(cat, "category_label", "N/A")
+            if matched_label is not None and label == matched_label:
+                style = "style='background-color: rgba(255, 70, 78, 0.15);'"
+                rows.append(
+                    f"<tr><td class='code-cell'><mark {style}>{code}</mark></td><td class='text-cell'><mark {style}>{label}</mark></td></tr>"
+                )
+            else:
+                rows.append(
+                    f"<tr><td class='code-cell'>{code}</td><td class='text-cell'>{label}</td></tr>"
+                )
+        return "<table class='styled-table'>" + "".join(rows) + "</table>"
+
+    def format_search_results(self, response, search_locations, compact=False):
         data = []
         is_category_search = "categories" in search_locations
 
@@ -295,8 +314,7 @@ class SearchResultsDataView(ListView):
                 )
 
                 categories = getattr(variable, "categories", []) or []
-                all_clean_categories = []
-                category_matched = None
+                matched_label = None
 
                 if (
                     "categories" in search_locations
@@ -304,37 +322,22 @@ class SearchResultsDataView(ListView):
                     and "variable.categories.category_label" in result.meta.highlight
                 ):
                     category_highlight = result.meta.highlight["variable.categories.category_label"]
-                    category_matched = category_highlight[0] if category_highlight else None
-
-                try:
-                    sorted_categories = sorted(
-                        categories,
-                        key=lambda cat: (
-                            int(cat.code) if cat.code.isdigit() else float("inf"),
-                            cat.code,
-                        ),
-                    )
-                except Exception as e:
-                    logger.error(
-                        "❌ Erreur lors du tri des catégories pour ID %s : %s",
-                        result.meta.id,
-                        e,
-                        exc_info=True,
-                    )
-                    sorted_categories = categories
-
-                for cat in sorted_categories:
-                    code = getattr(cat, "code", "N/A")
-                    label = getattr(cat, "category_label", "N/A")
-                    if category_matched and label == remove_html_tags(category_matched):
-                        style = "style='background-color: rgba(255, 70, 78, 0.15);'"
-                        all_clean_categories.append(
-                            f"<tr><td class='code-cell'><mark {style}>{code}</mark></td><td class='text-cell'><mark {style}>{label}</mark></td></tr>"
-                        )
-                    else:
-                        all_clean_categories.append(
-                            f"<tr><td class='code-cell'>{code}</td><td class='text-cell'>{label}</td></tr>"
-                        )
+                    if category_highlight:
+                        matched_label = remove_html_tags(category_highlight[0])
+
+                if compact:
+                    # Catégories déjà triées à l'indexation : [code, libellé, correspondance]
+                    categories_data = [
+                        [
+                            getattr(cat, "code", "N/A"),
+                            getattr(cat, "category_label", "N/A"),
+                            matched_label is not None
+                            and getattr(cat, "category_label", None) == matched_label,
+                        ]
+                        for cat in categories
+                    ]
+                else:
+                    categories_data = self.render_categories_table(categories, matched_label)
 
                 variable_name = getattr(result, "variable_name", "N/A")
                 if (
@@ -362,9 +365,7 @@ class SearchResultsDataView(ListView):
                         "question_text": highlighted_question,
                         "survey_name": survey_name,
                         "notes": getattr(result, "notes", "N/A"),
-                        "categories": "<table class='styled-table'>"
-                        + "".join(all_clean_categories)
-                        + "</table>",
+                        "categories": categories_data,
                         "internal_label": internal_label,
                         "is_category_search": is_category_search,
                         "survey_doi": survey_doi,
@@ -390,7 +391,8 @@ class SearchResultsDataView(ListView):
                 "search_location[]",
                 ["questions", "categories", "variable_name", "internal_label"],
             )
-            data = self.format_search_results(response, search_locations)
+            compact = request.POST.get("format") == "compact"
+            data = self.format_search_results(response, search_locations, compact=compact)
             return JsonResponse(
                 {
                     "recordsTotal": total_records,
@@ -405,6 +407,125 @@ class SearchResultsDataView(ListView):
             return JsonResponse({"error": str(e)}, status=500)
 
 
+@method_decorator(log_time, name="dispatch")
+class SearchFacetsView(SearchResultsDataView):
+    """Répartition des résultats de la recherche courante pour alimenter les filtres."""
+
+    facet_size = 1000
+
+    def build_facets_search(self):
+        search = self.build_filtered_search(highlight=False).extra(size=0)
+        search.aggs.bucket(
+            "collections",
+            "terms",
+            field="survey.subcollection.collection_id",
+            size=self.facet_size,
+        )
+        search.aggs.bucket(
+            "subcollections", "terms", field="survey.subcollection.id", size=self.facet_size
+        )
+        search.aggs.bucket("surveys", "terms", field="survey.id", size=self.facet_size)
+        search.aggs.bucket(
+            "years",
+            "terms",
+            field="survey.start_year",
+            size=self.facet_size,
+            order={"_key": "asc"},
+        )
+        return search
+
+    def post(self, request, *args, **kwargs):
+        try:
+            response = self.build_facets_search().execute()
+        except Exception as e:
+            logger.exception("❌ Erreur dans SearchFacetsView.post() : %s", e)
+            return JsonResponse({"error": str(e)}, status=500)
+
+        aggregations = response.aggregations
+        years = [
+            {"year": int(bucket.key), "count": bucket.doc_count}
+            for bucket in aggregations.years.buckets
+        ]
+        decades = {}
+        for year in sorted(years, key=lambda y: y["year"], reverse=True):
+            decades.setdefault((year["year"] // 10) * 10, []).append(year["year"])
+
+        return JsonResponse(
+            {
+                "total": response.hits.total.value,
+                "collections": self.format_terms(aggregations.collections),
+                "subcollections": self.format_terms(aggregations.subcollections),
+                "surveys": self.format_terms(aggregations.surveys),
+                "years": years,
+                "decades": decades,
+            }
+        )
+
+    def format_terms(self, aggregation):
+        return [
+            {"id": int(bucket.key), "count": bucket.doc_count} for bucket in aggregation.buckets
+        ]
+
+
+@log_time
+def get_suggestions(request):
+    """Retourne les suggestions d'autocomplétion via le completion suggester."""
+    search_value = unescape(request.GET.get("q", "").strip())
+    if not search_value:
+        return JsonResponse({"suggestions": []})
+
+    try:
+        size = int(request.GET.get("size", SUGGEST_DEFAULT_SIZE))
+    except ValueError:
+        return JsonResponse({"error": "Invalid size value"}, status=400)
+    size = max(1, min(size, SUGGEST_MAX_SIZE))
+
+    # Mêmes filtres (et même priorité) que build_filtered_search
+    survey_filter = parse_ids(request.GET.getlist("survey[]"))
+    subcollection_filter = parse_ids(request.GET.getlist("sub_collections[]"))
+    collections_filter = parse_ids(request.GET.getlist("collections[]"))
+
+    if survey_filter:
+        scopes = [f"survey:{survey_id}" for survey_id in survey_filter]
+    elif subcollection_filter:
+        scopes = [f"subcollection:{subcollection_id}" for subcollection_id in subcollection_filter]
+    elif collections_filter:
+        scopes = [f"collection:{collection_id}" for collection_id in collections_filter]
+    else:
+        scopes = ["all"]
+
+    years = parse_ids(request.GET.getlist("years[]"))
+    if years:
+        scopes = [suggest_scope(scope, year) for scope in scopes for year in years]
+
+    search = (
+        BindingSurveyDocument.search()
+        .extra(size=0)
+        .source(False)
+        .suggest(
+            "suggestions",
+            search_value,
+            completion={
+                "field": "suggest",
+                "size": size,
+                "skip_duplicates": True,
+                "contexts": {SUGGEST_CONTEXT: scopes},
+            },
+        )
+    )
+
+    try:
+        response = search.execute()
+    except Exception as e:
+        logger.exception("❌ Erreur dans get_suggestions() : %s", e)
+        return JsonResponse({"error": str(e)}, status=500)
+
+    suggestions = [
+        option.text for entry in response.suggest.suggestions for option in entry.options
+    ]
+    return JsonResponse({"suggestions": suggestions})
+
+
 @method_decorator(log_time, name="dispatch")
 def search_results(request):
     selected_surveys = request.GET.getlist("survey")
@@ -427,25 +548,13 @@ def search_results(request):
     request.session["selected_collection"] = selected_collection
     request.session["search_location"] = search_locations
 
-    collections = Collection.objects.all().order_by("name")
-    subcollections = Subcollection.objects.all().order_by("name")
-    surveys = Survey.objects.all().order_by("name")
-
-    years = Survey.objects.values_list("start_date", flat=True).distinct()
-    years = [year.year for year in years if year is not None]
-    years.sort()
-
-    decades = {}
-    for year in years:
-        decade = (year // 10) * 10
-        if decade not in decades:
-            decades[decade] = []
-        decades[decade].append(year)
+    hierarchy = get_hierarchy()
+    decades = hierarchy.get_decades(reverse=False)
 
     context = {
-        "collections": collections,
-        "subcollections": subcollections,
-        "surveys": surveys,
+        "collections": hierarchy.collections,
+        "subcollections": hierarchy.subcollections,
+        "surveys": hierarchy.surveys,
         "search_location": search_locations,
         "selected_surveys": selected_surveys,
         "selected_sub_collection": selected_sub_collection,
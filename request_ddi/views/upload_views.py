@@ -1,5 +1,7 @@
 # -- STDLIB
 import csv
+import io
+import itertools
 import logging
 import re
 from datetime import datetime
@@ -13,18 +15,24 @@ from django.contrib import messages
 from django.db import IntegrityError, transaction
 from django.http import JsonResponse
 from django.urls import reverse_lazy
+from django.utils import timezone
 from django.utils.decorators import method_decorator
+from django.utils.html import escape
 from django.views import View
 from django.views.decorators.csrf import csrf_exempt
 from django.views.generic.edit import FormView
 
 # -- LOCAL
 from request_ddi.core.data_importer import DataImporter
+from request_ddi.core.documents import BindingSurveyDocument
+from request_ddi.core.export_snapshots import invalidate_export_snapshots_on_commit
 from request_ddi.core.forms import CSVUploadFormCollection, XMLUploadForm
+from request_ddi.core.hierarchy import invalidate_hierarchy
 from request_ddi.core.models import (
     BindingSurveyRepresentedVariable,
     Collection,
     Distributor,
+    ImportedFile,
     Subcollection,
     Survey,
 )
@@ -36,6 +44,28 @@ from request_ddi.views.mixins import StaffRequiredMixin, staff_required_json
 logger = logging.getLogger(__name__)
 perf_logger = logging.getLogger("performance")
 
+# Champs d'enquête repris tels quels du CSV de métadonnées : {champ du modèle: colonne}
+SURVEY_CSV_COLUMNS = {
+    "name": "title",
+    "language": "xml_lang",
+    "author": "author",
+    "producer": "producer",
+    "geographic_coverage": "geographic_coverage",
+    "geographic_unit": "geographic_unit",
+    "unit_of_analysis": "unit_of_analysis",
+    "contact": "contact",
+}
+SURVEY_UPDATE_FIELDS = [
+    *SURVEY_CSV_COLUMNS,
+    "subcollection",
+    "start_date",
+    "start_year",
+    "date_last_version",
+]
+SURVEY_BATCH_SIZE = 500
+# Champs d'enquête recopiés dans les documents Elasticsearch des bindings
+SURVEY_INDEXED_FIELDS = {"name", "start_date", "subcollection_id"}
+
 
 @method_decorator(log_time, name="dispatch")
 class XMLUploadView(StaffRequiredMixin, FormView):
@@ -55,13 +85,25 @@ class XMLUploadView(StaffRequiredMixin, FormView):
     @transaction.atomic
     def form_valid(self, form):
         self.errors = []  # Initialiser la liste des erreurs
-        data = self.get_data(form)
-        question_datas = list(self.convert_data(data))
+        files = self.get_data(form)
+        # Empreintes calculées avant toute analyse pour reconnaître les fichiers déjà importés
+        # (celle du fichier validé par le formulaire y est déjà calculée)
+        form_file = form.files.get("xml_file")
+        digests = {
+            file: form.cleaned_data["sha256"] if file is form_file else ImportedFile.hash_file(file)
+            for file in files
+        }
+        if not form.cleaned_data.get("force"):
+            files = self.skip_imported_files(files, digests)
+            if not files:
+                return super().form_valid(form)
+
+        question_datas = list(self.convert_data(files))
 
         if self.errors:
             return self.form_invalid(form)
 
-        importer = DataImporter()
+        importer = DataImporter(incremental=form.cleaned_data.get("incremental", False))
 
         try:
             num_records, num_new_variables, num_new_bindings = importer.import_data(question_datas)
@@ -71,14 +113,18 @@ class XMLUploadView(StaffRequiredMixin, FormView):
                 self.errors.extend(importer.errors)
                 return self.form_invalid(form)
 
+            summary = {
+                "num_records": num_records,
+                "num_new_variables": num_new_variables,
+                "num_new_bindings": num_new_bindings,
+            }
+            if importer.incremental:
+                summary["num_unchanged"] = importer.num_unchanged
+            self.record_imported_files(files, digests, summary)
+
             messages.success(
                 self.request,
-                "Le fichier a été traité avec succès :<br/>"
-                "<ul>"
-                f"<li>{num_records} lignes ont été analysées.</li>"
-                f"<li>{num_new_variables} nouvelles variables représentées créées.</li>"
-                f"<li>{num_new_bindings} nouveaux bindings créés.</li>"
-                "</ul>",
+                f"Le fichier a été traité avec succès :<br/>{self.format_summary(summary)}",
                 extra_tags="safe",
             )
             return super().form_valid(form)
@@ -89,6 +135,82 @@ class XMLUploadView(StaffRequiredMixin, FormView):
         except Exception as e:
             return self.handle_error(f"Erreur inattendue : {e!s}", form)
 
+    def format_summary(self, summary):
+        unchanged = (
+            f"<li>{summary['num_unchanged']} variables inchangées ignorées.</li>"
+            if "num_unchanged" in summary
+            else ""
+        )
+        return (
+            "<ul>"
+            f"<li>{summary['num_records']} lignes ont été analysées.</li>"
+            f"<li>{summary['num_new_variables']} nouvelles variables représentées créées.</li>"
+            f"<li>{summary['num_new_bindings']} nouveaux bindings créés.</li>"
+            f"{unchanged}"
+            "</ul>"
+        )
+
+    def skip_imported_files(self, files, digests):
+        """
+        Écarte les fichiers identiques à un import précédent, en rappelant le bilan de cet
+        import ; retourne les fichiers restant à importer.
+        """
+        imported_files = ImportedFile.objects.select_related("survey").in_bulk(
+            set(digests.values()), field_name="sha256"
+        )
+        remaining = []
+        for file in files:
+            imported_file = imported_files.get(digests[file])
+            if imported_file is None:
+                remaining.append(file)
+                continue
+            imported_at = timezone.localtime(imported_file.imported_at)
+            survey = f" ({imported_file.survey})" if imported_file.survey else ""
+            # Bilan connu seulement si le fichier avait été importé seul
+            summary = (
+                f"<br/>{self.format_summary(imported_file.summary)}"
+                if imported_file.summary
+                else ""
+            )
+            messages.info(
+                self.request,
+                f"Le fichier {escape(file.name)} est identique à celui importé le "
+                f"{imported_at:%d/%m/%Y à %H:%M}{escape(survey)} : il n'a pas été retraité."
+                f"{summary}",
+                extra_tags="safe",
+            )
+        return remaining
+
+    def record_imported_files(self, files, digests, summary):
+        """
+        Mémorise l'empreinte des fichiers importés, avec leur enquête et le bilan de l'import.
+        Le bilan, global à l'envoi, n'est conservé que pour un fichier importé seul.
+        Les empreintes des imports précédents de ces enquêtes sont oubliées : une ancienne
+        version d'un codebook doit pouvoir être réimportée par-dessus la nouvelle.
+        """
+        surveys = Survey.objects.in_bulk(set(self.file_dois.values()), field_name="external_ref")
+        now = timezone.now()
+        if len(files) > 1:
+            summary = {}
+        imported_surveys = set()
+        for file in files:
+            survey = surveys.get(self.file_dois.get(file))
+            ImportedFile.objects.update_or_create(
+                sha256=digests[file],
+                defaults={
+                    "file_name": file.name,
+                    "survey": survey,
+                    "imported_at": now,
+                    "summary": summary,
+                },
+            )
+            if survey is not None:
+                imported_surveys.add(survey)
+        if imported_surveys:
+            ImportedFile.objects.filter(survey__in=imported_surveys).exclude(
+                sha256__in=[digests[file] for file in files]
+            ).delete()
+
     def form_invalid(self, form):
         error_messages = []
 
@@ -117,6 +239,8 @@ class XMLUploadView(StaffRequiredMixin, FormView):
     def get_data(self, form):
         files = self.request.FILES.getlist("xml_file")
         self.errors = []
+        # DOI de l'enquête décrite par chaque fichier (cf. ImportedFile)
+        self.file_dois = {}
         return files
 
     def convert_data(self, files):
@@ -131,6 +255,7 @@ class XMLUploadView(StaffRequiredMixin, FormView):
                 if result:
                     logger.info(f"{len(result)} variables extraites du fichier {file.name}")
                     results.extend(result)
+                    self.file_dois[file] = result[0][0]
             except Exception as e:
                 error_msg = f"Erreur lors de la lecture du fichier {file.name}: {e!s}"
                 self.errors.append(error_msg)
@@ -154,14 +279,12 @@ class CSVUploadViewCollection(StaffRequiredMixin, View):
         try:
             data = self.get_data(form)
             delimiter = form.cleaned_data["delimiter"]
-            survey_datas = list(self.convert_data(data, delimiter))
-            self.process_data(survey_datas)
-            return JsonResponse(
-                {
-                    "status": "success",
-                    "message": "Le fichier CSV a été importé avec succès.",
-                }
-            )
+            survey_datas = self.convert_data(data, delimiter)
+            updated = self.process_data(survey_datas, upsert=form.cleaned_data["upsert"])
+            message = "Le fichier CSV a été importé avec succès."
+            if updated:
+                message += f" {len(updated)} enquête(s) mise(s) à jour."
+            return JsonResponse({"status": "success", "message": message, "updated": updated})
         except forms.ValidationError as ve:
             logger.error("Validation error: %s", ve.messages)
             return JsonResponse({"status": "error", "message": ve.messages})
@@ -186,99 +309,199 @@ class CSVUploadViewCollection(StaffRequiredMixin, View):
         return JsonResponse({"error": "Méthode non autorisée"}, status=405)
 
     def get_data(self, form):
-        # Utilisez les données décodées du formulaire
-        return form.cleaned_data["decoded_csv"]
+        # Fichier envoyé, déjà validé et rembobiné par le formulaire
+        return form.cleaned_data["csv_file"]
 
-    def convert_data(self, content, delimiter):
-        reader = csv.DictReader(content, delimiter=delimiter)
-        return reader
+    def convert_data(self, csv_file, delimiter):
+        """Lecteur paresseux : les lignes sont décodées au fur et à mesure de l'import."""
+        text = io.TextIOWrapper(csv_file.file, encoding="utf-8", newline="")
+        return csv.DictReader(text, delimiter=delimiter)
 
     def extract_doi_from_error(self, error_message):
         match = re.search(r"\(external_ref\)=\((.*?)\)", error_message)
         return match.group(1) if match else "inconnu"
 
     @transaction.atomic
-    def process_data(self, survey_datas):
-        for line_number, row in enumerate(survey_datas, start=1):
-            distributor_name = row["distributor"]
-            distributor, created = Distributor.objects.get_or_create(name=distributor_name)
-
-            collection_name = row["collection"]
-            collection, created = Collection.objects.get_or_create(
-                name=collection_name, distributor=distributor
-            )
-
-            subcollection_name = row["sous-collection"]
-            subcollection, created = Subcollection.objects.get_or_create(  # noqa: RUF059
-                name=subcollection_name, collection=collection
-            )
-
-            survey_doi = row["doi"]
-            if not survey_doi.startswith("doi:"):
-                msg = f"Le DOI à la ligne {line_number} n'est pas dans le bon format : {survey_doi}"
-                raise ValueError(msg)
-
-            survey_name = row["title"]
-            survey_language = row["xml_lang"]
-            survey_author = row["author"]
-            survey_producer = row["producer"]
-            survey_start_date = row["start_date"]
-            survey_geographic_coverage = row["geographic_coverage"]
-            survey_geographic_unit = row["geographic_unit"]
-            survey_unit_of_analysis = row["unit_of_analysis"]
-            survey_contact = row["contact"]
-            survey_date_last_version = row["date_last_version"]
-
-            # Conversion de survey_start_date en objet date (année uniquement)
-            if survey_start_date:
-                try:
-                    # Tente de convertir la date au format "YYYY"
-                    survey_start_date = datetime.strptime(  # noqa: DTZ007
-                        survey_start_date, "%Y"
-                    ).date()
-                except ValueError:
-                    try:
-                        # Si ça échoue, tente de convertir la date au format "YYYY-MM-DD"
-                        survey_start_date = datetime.strptime(  # noqa: DTZ007
-                            survey_start_date, "%Y-%m-%d"
-                        ).date()
-                    except ValueError:
-                        msg = f"L'année de début à la ligne {line_number} n'est pas valide : {survey_start_date}"
-                        raise ValueError(msg) from None
-
+    def process_data(self, survey_datas, upsert=False):
+        """
+        Import groupé par paquets de SURVEY_BATCH_SIZE lignes : chaque paquet est validé,
+        ses distributeurs, collections et sous-collections résolus en quelques requêtes, puis
+        ses nouvelles enquêtes insérées en un seul bulk_create. Une ligne invalide annule
+        l'ensemble de l'import (transaction unique).
+
+        En mode upsert, les enquêtes existantes (clé : DOI) dont des colonnes diffèrent sont
+        mises à jour au lieu de faire échouer l'import. Retourne le détail des modifications
+        par ligne : [{"line": ..., "doi": ..., "changes": {champ: {"old": ..., "new": ...}}}].
+        """
+        rows = (self.parse_row(row, line_number) for line_number, row in enumerate(survey_datas, 1))
+        seen_dois = set()
+        updated = []
+        while chunk := list(itertools.islice(rows, SURVEY_BATCH_SIZE)):
+            updated += self.import_chunk(chunk, seen_dois, upsert)
+
+        # bulk_create et bulk_update n'émettent pas de signaux : les caches sont invalidés ici
+        invalidate_hierarchy()
+        transaction.on_commit(invalidate_hierarchy)
+        if updated:
+            invalidate_export_snapshots_on_commit()
+        return updated
+
+    def import_chunk(self, rows, seen_dois, upsert):
+        subcollection_ids = self.resolve_subcollections(rows)
+
+        # Les doublons avec un paquet précédent sont retrouvés ici, déjà insérés en base
+        existing_surveys = Survey.objects.in_bulk(
+            [row["survey"]["external_ref"] for row in rows], field_name="external_ref"
+        )
+        new_surveys = {}
+        updated_surveys = {}
+        updated = []
+        for row in rows:
+            values = {**row["survey"], "subcollection_id": subcollection_ids[row["subcollection"]]}
+            doi = values["external_ref"]
+            current = existing_surveys.get(doi) or new_surveys.get(doi)
+            if current is None:
+                survey = Survey(**values)
+                survey.fill_start_year()
+                new_surveys[doi] = survey
             else:
-                survey_start_date = None
-
-            # Vérification et formatage de survey_date_last_version
-            if survey_date_last_version:
-                len_format_yyyy_mm = 7
-                if len(survey_date_last_version) == len_format_yyyy_mm:
-                    survey_date_last_version += "-01"
-                try:
-                    survey_date_last_version = datetime.strptime(  # noqa: DTZ007
-                        survey_date_last_version, "%Y-%m-%d"
-                    ).date()
-                except ValueError:
-                    msg = f"La date de la dernière version à la ligne {line_number} n'est pas valide : {survey_date_last_version}"
-                    raise ValueError(msg) from None
-
-            else:
-                survey_date_last_version = None
-
-            Survey.objects.get_or_create(
-                external_ref=survey_doi,
-                name=survey_name,
-                subcollection=subcollection,
-                language=survey_language,
-                author=survey_author,
-                producer=survey_producer,
-                start_date=survey_start_date,
-                geographic_coverage=survey_geographic_coverage,
-                geographic_unit=survey_geographic_unit,
-                unit_of_analysis=survey_unit_of_analysis,
-                contact=survey_contact,
-                date_last_version=survey_date_last_version,
-            )
+                changes = {
+                    field: {"old": getattr(current, field), "new": value}
+                    for field, value in values.items()
+                    if getattr(current, field) != value
+                }
+                # Un DOI déjà rencontré dans le fichier doit y figurer à l'identique
+                if changes and (not upsert or doi in seen_dois):
+                    msg = f"Une enquête avec le DOI {doi} existe déjà dans la base de données."
+                    raise ValueError(msg)
+                if changes:
+                    for field, change in changes.items():
+                        setattr(current, field, change["new"])
+                    current.fill_start_year()
+                    updated_surveys[doi] = current
+                    updated.append({"line": row["line_number"], "doi": doi, "changes": changes})
+            seen_dois.add(doi)
+
+        Survey.objects.bulk_create(
+            new_surveys.values(),
+            update_conflicts=True,
+            unique_fields=["external_ref"],
+            update_fields=SURVEY_UPDATE_FIELDS,
+        )
+        if updated_surveys:
+            self.update_surveys(updated_surveys.values(), updated)
+        return updated
+
+    def update_surveys(self, surveys, updated):
+        """Met à jour en un seul bulk_update les seules colonnes modifiées du paquet."""
+        changed_fields = {field for diff in updated for field in diff["changes"]}
+        if "start_date" in changed_fields:
+            changed_fields.add("start_year")
+        Survey.objects.bulk_update(surveys, fields=sorted(changed_fields))
+
+        # Les bindings des enquêtes concernées sont réindexés après validation de l'import
+        reindexed_dois = [
+            diff["doi"] for diff in updated if SURVEY_INDEXED_FIELDS & diff["changes"].keys()
+        ]
+        if reindexed_dois:
+            BindingSurveyRepresentedVariable.objects.filter(
+                survey__external_ref__in=reindexed_dois
+            ).update(is_indexed=False)
+            transaction.on_commit(BindingSurveyDocument().update_index)
+
+    def parse_row(self, row, line_number):
+        """Valide et convertit une ligne du CSV (DOI, dates) avant toute écriture en base."""
+        survey_doi = row["doi"]
+        if not survey_doi.startswith("doi:"):
+            msg = f"Le DOI à la ligne {line_number} n'est pas dans le bon format : {survey_doi}"
+            raise ValueError(msg)
+
+        survey = {"external_ref": survey_doi}
+        for field, column in SURVEY_CSV_COLUMNS.items():
+            survey[field] = row[column]
+        survey["start_date"] = self.parse_start_date(row["start_date"], line_number)
+        survey["date_last_version"] = self.parse_date_last_version(
+            row["date_last_version"], line_number
+        )
+
+        return {
+            "line_number": line_number,
+            "survey": survey,
+            "subcollection": (row["distributor"], row["collection"], row["sous-collection"]),
+        }
+
+    def parse_start_date(self, survey_start_date, line_number):
+        # Conversion de survey_start_date en objet date (année uniquement)
+        if not survey_start_date:
+            return None
+        try:
+            # Tente de convertir la date au format "YYYY"
+            return datetime.strptime(survey_start_date, "%Y").date()  # noqa: DTZ007
+        except ValueError:
+            try:
+                # Si ça échoue, tente de convertir la date au format "YYYY-MM-DD"
+                return datetime.strptime(survey_start_date, "%Y-%m-%d").date()  # noqa: DTZ007
+            except ValueError:
+                msg = f"L'année de début à la ligne {line_number} n'est pas valide : {survey_start_date}"
+                raise ValueError(msg) from None
+
+    def parse_date_last_version(self, survey_date_last_version, line_number):
+        # Vérification et formatage de survey_date_last_version
+        if not survey_date_last_version:
+            return None
+        len_format_yyyy_mm = 7
+        if len(survey_date_last_version) == len_format_yyyy_mm:
+            survey_date_last_version += "-01"
+        try:
+            return datetime.strptime(survey_date_last_version, "%Y-%m-%d").date()  # noqa: DTZ007
+        except ValueError:
+            msg = f"La date de la dernière version à la ligne {line_number} n'est pas valide : {survey_date_last_version}"
+            raise ValueError(msg) from None
+
+    def resolve_subcollections(self, rows):
+        """
+        Équivalent groupé des get_or_create successifs sur distributeur, collection et
+        sous-collection : {(distributeur, collection, sous-collection): id de sous-collection}.
+        """
+        keys = {row["subcollection"] for row in rows}
+
+        distributors = bulk_get_or_create(Distributor, ["name"], {(d,) for d, _, _ in keys})
+        collections = bulk_get_or_create(
+            Collection,
+            ["name", "distributor_id"],
+            {(c, distributors[(d,)].id) for d, c, _ in keys},
+        )
+        subcollections = bulk_get_or_create(
+            Subcollection,
+            ["name", "collection_id"],
+            {(s, collections[(c, distributors[(d,)].id)].id) for d, c, s in keys},
+        )
+        return {
+            (d, c, s): subcollections[(s, collections[(c, distributors[(d,)].id)].id)].id
+            for d, c, s in keys
+        }
+
+
+def bulk_get_or_create(model, field_names, keys):
+    """
+    get_or_create groupé : retourne {clé: instance} pour des clés (tuples de valeurs des
+    champs field_names), en créant les instances manquantes en un seul bulk_create.
+    """
+    filters = {f"{field}__in": {key[i] for key in keys} for i, field in enumerate(field_names)}
+
+    def existing():
+        # Tri décroissant : en cas de doublons en base, la plus ancienne instance l'emporte
+        return {
+            tuple(getattr(instance, field) for field in field_names): instance
+            for instance in model.objects.filter(**filters).order_by("-id")
+        }
+
+    instances = existing()
+    missing = keys - instances.keys()
+    if missing:
+        model.objects.bulk_create(model(**dict(zip(field_names, key))) for key in missing)
+        instances = existing()
+    return instances
 
 
 @log_time